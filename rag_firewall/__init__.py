@@ -4,4 +4,5 @@
 from .firewall import Firewall, wrap_retriever
 from .audit import Audit
 from .graph.wrapper import FirewallGraph, GraphTextSerializer
-from .graph.types import GraphNode, GraphEdge, GraphPath, Subgraph
\ No newline at end of file
+from .graph.types import GraphNode, GraphEdge, GraphPath, Subgraph
+from .graph.columnar import ColumnarSubgraph
\ No newline at end of file
@@ -1,9 +1,10 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright (c) 2025 Tal Adari
 
-import json, os, time
+import atexit, glob, json, multiprocessing.util, os, queue, re, sqlite3, threading, time
+from collections import deque
 from dataclasses import dataclass, asdict
-from typing import Any, List, Optional
+from typing import Any, Iterator, List, Optional
 
 _LOG_PATH = os.environ.get("RAGFW_AUDIT_LOG", "audit.jsonl")
 
@@ -33,21 +34,456 @@ class AuditEvent:
         return asdict(self)
 
 
+FSYNC_MODES = ("none", "batch", "interval")
+_FLUSH = object()
+_STOP = object()
+_ROTATED_SUFFIX = re.compile(r"\.\d{8}-\d{6}(?:-\d+)?$")
+
+
+def rotated_files(path: str) -> List[str]:
+    """Rotated siblings of `path` (path.YYYYmmdd-HHMMSS[-n]), oldest first."""
+    files = [f for f in glob.glob(glob.escape(path) + ".*") if _ROTATED_SUFFIX.search(f[len(path):])]
+    return sorted(files, key=lambda f: (f[len(path) + 1:len(path) + 16], int(f[len(path) + 17:] or 0)))
+
+
+class Rotation:
+    """
+    Size/time based rotation. The active file is renamed to a timestamped
+    sibling (so references held by the index stay valid) and the oldest
+    siblings beyond `backup_count` are deleted.
+    """
+    def __init__(self, max_bytes: Optional[int] = None, interval: Optional[float] = None, backup_count: Optional[int] = None):
+        self.max_bytes = max_bytes; self.interval = interval; self.backup_count = backup_count
+        self._since = time.time()
+
+    def due(self, path: str, pending: int = 0) -> bool:
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            return False
+        if not size:
+            return False
+        if self.max_bytes and size + pending > self.max_bytes:
+            return True
+        return bool(self.interval) and time.time() - self._since >= self.interval
+
+    def rotate(self, path: str) -> Optional[str]:
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime())
+        target = f"{path}.{stamp}"
+        n = 0
+        while os.path.exists(target):
+            n += 1
+            target = f"{path}.{stamp}-{n}"
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            return None
+        self._since = time.time()
+        if self.backup_count is not None:
+            for old in rotated_files(path)[:-self.backup_count or None]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        return target
+
+
+def _rotation(max_bytes=None, rotate_interval=None, backup_count=None) -> Optional[Rotation]:
+    if not (max_bytes or rotate_interval):
+        return None
+    return Rotation(max_bytes=max_bytes, interval=rotate_interval, backup_count=backup_count)
+
+
+class FileAuditSink:
+    """Synchronous sink: appends each event to the log as it is logged."""
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None,
+                 rotate_interval: Optional[float] = None, backup_count: Optional[int] = None):
+        self._path = path
+        self.rotation = _rotation(max_bytes, rotate_interval, backup_count)
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path or _LOG_PATH
+
+    def write(self, event: dict):
+        line = json.dumps(event) + "\n"
+        with self._lock:
+            if self.rotation and self.rotation.due(self.path, len(line)):
+                self.rotation.rotate(self.path)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncAuditSink:
+    """
+    Background sink: events go onto a bounded queue and a writer thread appends
+    them in batches, keeping disk I/O off the retrieval path.
+    - A batch is written once `batch_size` events are queued or `flush_interval`
+      seconds after its first event, whichever comes first.
+    - fsync: "none" (leave it to the OS), "batch" (after every batch) or
+      "interval" (at most every `fsync_interval` seconds).
+    - overflow: "block" waits for room when the queue is full, "drop" discards
+      the event and counts it in `dropped`.
+    `flush()` waits until everything queued so far is on disk; `close()` drains
+    the queue and stops the thread (also registered with atexit).
+    max_bytes / rotate_interval / backup_count enable rotation (see Rotation).
+    """
+    def __init__(self, path: Optional[str] = None, queue_size: int = 10000, batch_size: int = 256,
+                 flush_interval: float = 0.2, fsync: str = "none", fsync_interval: float = 1.0,
+                 overflow: str = "block", max_bytes: Optional[int] = None,
+                 rotate_interval: Optional[float] = None, backup_count: Optional[int] = None):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"unknown fsync mode {fsync!r}; expected one of {FSYNC_MODES}")
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"unknown overflow policy {overflow!r}; expected 'block' or 'drop'")
+        self._path = path
+        self.queue_size = queue_size; self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval; self.fsync = fsync; self.fsync_interval = fsync_interval
+        self.overflow = overflow
+        self.rotation = _rotation(max_bytes, rotate_interval, backup_count)
+        self.dropped = 0; self.written = 0
+        self._closed = False
+        self._start()
+        atexit.register(self.close)
+
+    @property
+    def path(self) -> str:
+        return self._path or _LOG_PATH
+
+    @property
+    def depth(self) -> int:
+        """Events queued but not yet written."""
+        return self._queue.qsize()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        self._thread = threading.Thread(target=self._run, name="ragfw-audit", daemon=True)
+        self._thread.start()
+
+    def _ensure_running(self):
+        # a forked worker inherits the queue but not the writer thread; atexit
+        # does not run in multiprocessing children, their finalizers do
+        if self._pid != os.getpid():
+            self._start()
+            multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def write(self, event: dict):
+        if self._closed:
+            FileAuditSink(self._path).write(event)
+            return
+        self._ensure_running()
+        if self.overflow == "drop":
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self._queue.put(event)
+
+    def flush(self):
+        if self._closed:
+            return
+        self._ensure_running()
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        fd = None; fd_path = None; last_fsync = time.monotonic()
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _FLUSH and batch[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            events = [e for e in batch if e is not _FLUSH and e is not _STOP]
+            try:
+                if events:
+                    data = "".join(json.dumps(e) + "\n" for e in events).encode("utf-8")
+                    if self.rotation and self.rotation.due(self.path, len(data)):
+                        self.rotation.rotate(self.path)
+                    if fd is not None and (fd_path != self.path or not _same_file(fd, fd_path)):
+                        os.close(fd); fd = None
+                    if fd is None:
+                        fd_path = self.path
+                        fd = os.open(fd_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    while data:  # one append per batch; loop only on short writes
+                        data = data[os.write(fd, data):]
+                    self.written += len(events)
+                    now = time.monotonic()
+                    if self.fsync == "batch" or (self.fsync == "interval" and now - last_fsync >= self.fsync_interval):
+                        os.fsync(fd); last_fsync = now
+            except Exception:
+                pass
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        if fd is not None:
+            if self.fsync != "none":
+                os.fsync(fd)
+            os.close(fd)
+
+
+def _same_file(fd: int, path: str) -> bool:
+    """False once `path` was rotated away from under an open descriptor."""
+    try:
+        return os.fstat(fd).st_ino == os.stat(path).st_ino
+    except OSError:
+        return False
+
+
+def tail_lines(path: str, n: int, block_size: int = 65536) -> List[str]:
+    """Last `n` lines of a file, read backwards in blocks instead of loading it whole."""
+    if n <= 0:
+        return []
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        buf = b""; pos = end
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    lines = buf.decode("utf-8", errors="replace").splitlines()
+    if pos > 0:
+        lines = lines[1:]  # first line may be partial
+    return [x for x in lines if x.strip()][-n:]
+
+
+def _iter_lines(path: str) -> Iterator[tuple]:
+    """(offset, raw line) for every complete line of a file."""
+    with open(path, "rb") as f:
+        offset = 0
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            yield offset, raw
+            offset += len(raw)
+
+
+def _index_keys(ev: dict) -> List[tuple]:
+    """(decision, chunk_hash) pairs an event is found under: its own and one per artifact row."""
+    keys = [(ev.get("decision"), ev.get("chunk_hash"))]
+    for row in ev.get("artifacts") or ():
+        if isinstance(row, dict):
+            keys.append((row.get("decision"), row.get("chunk_hash")))
+    return keys
+
+
+class AuditIndex:
+    """
+    Optional SQLite sidecar (default `<log>.idx`) indexing audit events by
+    timestamp, decision and chunk_hash. `refresh()` only parses lines appended
+    since the last refresh and follows rotated files by inode, so it works with
+    any writer; `query()` then reads back just the matching lines.
+    Events carrying per-artifact rows (graph_sanitize) are also indexed under
+    each row's decision and chunk_hash, so an artifact's hash finds its event.
+    """
+    def __init__(self, log_path: Optional[str] = None, index_path: Optional[str] = None):
+        self.log_path = log_path or Audit.path()
+        self.index_path = index_path or self.log_path + ".idx"
+        self._lock = threading.Lock()
+        con = self._connect()
+        con.executescript(
+            "CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, inode INTEGER, offset INTEGER);"
+            "CREATE TABLE IF NOT EXISTS events (ts REAL, decision TEXT, chunk_hash TEXT, file TEXT, offset INTEGER, length INTEGER);"
+            "CREATE INDEX IF NOT EXISTS events_ts ON events(ts);"
+            "CREATE INDEX IF NOT EXISTS events_hash ON events(chunk_hash, ts);"
+            "CREATE INDEX IF NOT EXISTS events_decision ON events(decision, ts);"
+        )
+        con.close()
+
+    def _connect(self):
+        con = sqlite3.connect(self.index_path)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def refresh(self) -> int:
+        """Index new lines; returns how many events were added."""
+        added = 0
+        with self._lock:
+            con = self._connect()
+            try:
+                with con:
+                    known = {name: (inode, offset) for name, inode, offset in con.execute("SELECT name, inode, offset FROM files")}
+                    on_disk = {f: os.stat(f).st_ino for f in rotated_files(self.log_path) + [self.log_path] if os.path.exists(f)}
+                    by_inode = {ino: f for f, ino in on_disk.items()}
+                    for name, (inode, offset) in known.items():
+                        if on_disk.get(name) == inode:
+                            continue
+                        moved = by_inode.get(inode)
+                        if moved and moved not in known:  # rotated: same bytes under a new name
+                            con.execute("UPDATE events SET file=? WHERE file=?", (moved, name))
+                            con.execute("UPDATE files SET name=? WHERE name=?", (moved, name))
+                        else:  # pruned or truncated
+                            con.execute("DELETE FROM events WHERE file=?", (name,))
+                            con.execute("DELETE FROM files WHERE name=?", (name,))
+                    known = {name: (inode, offset) for name, inode, offset in con.execute("SELECT name, inode, offset FROM files")}
+                    for name, inode in on_disk.items():
+                        start = known.get(name, (inode, 0))[1]
+                        if start > os.path.getsize(name):  # truncated in place
+                            con.execute("DELETE FROM events WHERE file=?", (name,))
+                            start = 0
+                        rows = []; end = start
+                        with open(name, "rb") as f:
+                            f.seek(start)
+                            for raw in f:
+                                if not raw.endswith(b"\n"):
+                                    break
+                                try:
+                                    ev = json.loads(raw)
+                                    rows.extend((ev.get("ts"), d, h, name, end, len(raw)) for d, h in _index_keys(ev))
+                                except Exception:
+                                    pass
+                                end += len(raw)
+                        con.executemany("INSERT INTO events(ts, decision, chunk_hash, file, offset, length) VALUES (?,?,?,?,?,?)", rows)
+                        con.execute("INSERT OR REPLACE INTO files(name, inode, offset) VALUES (?,?,?)", (name, inode, end))
+                        added += len(rows)
+            finally:
+                con.close()
+        return added
+
+    def query(self, decision: Optional[str] = None, chunk_hash: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, limit: int = 100,
+              refresh: bool = True) -> List[dict]:
+        """Most recent `limit` matching events, returned oldest first."""
+        if refresh:
+            self.refresh()
+        where, args = [], []
+        for clause, val in (("decision=?", decision), ("chunk_hash=?", chunk_hash), ("ts>=?", since), ("ts<=?", until)):
+            if val is not None:
+                where.append(clause); args.append(val)
+        sql = "SELECT file, offset, length, MAX(ts) AS t FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " GROUP BY file, offset ORDER BY t DESC LIMIT ?"  # one line may be indexed once per artifact
+        con = self._connect()
+        try:
+            rows = con.execute(sql, args + [int(limit)]).fetchall()
+        finally:
+            con.close()
+        out, handles = [], {}
+        try:
+            for name, offset, length, _ in reversed(rows):
+                f = handles.get(name) or handles.setdefault(name, open(name, "rb"))
+                f.seek(offset)
+                out.append(json.loads(f.read(length)))
+        finally:
+            for f in handles.values():
+                f.close()
+        return out
+
+
 class Audit:
-    @staticmethod
-    def log(event: AuditEvent | dict):
+    _sink = FileAuditSink()
+
+    @classmethod
+    def configure(cls, mode: str = "sync", path: Optional[str] = None, **options):
+        """
+        Select the process-wide audit sink. mode="sync" appends each event
+        inline (FileAuditSink); mode="async" uses AsyncAuditSink. Extra options
+        go to the sink, e.g. max_bytes/rotate_interval/backup_count.
+        The previous sink is drained and closed.
+        """
+        if mode == "sync":
+            sink = FileAuditSink(path, **options)
+        elif mode == "async":
+            sink = AsyncAuditSink(path, **options)
+        else:
+            raise ValueError(f"unknown audit mode {mode!r}; expected 'sync' or 'async'")
+        cls.set_sink(sink)
+        return sink
+
+    @classmethod
+    def set_sink(cls, sink, close: bool = True):
+        """Install `sink`; close=False leaves the previous sink open, e.g. to restore it later."""
+        old, cls._sink = cls._sink, sink
+        if close and old is not None and old is not sink:
+            old.close()
+
+    @classmethod
+    def sink(cls):
+        return cls._sink
+
+    @classmethod
+    def flush(cls):
+        cls._sink.flush()
+
+    @classmethod
+    def path(cls) -> str:
+        return getattr(cls._sink, "path", _LOG_PATH)
+
+    @classmethod
+    def log(cls, event: AuditEvent | dict):
         try:
             if isinstance(event, AuditEvent):
                 event = event.to_dict()
-            with open(_LOG_PATH, "a", encoding="utf-8") as f:
-                f.write(json.dumps(event) + "\n")
+            cls._sink.write(event)
         except Exception:
             pass
 
-    @staticmethod
-    def tail(n: int = 20) -> List[dict]:
-        if not os.path.exists(_LOG_PATH):
-            return []
-        with open(_LOG_PATH, "r", encoding="utf-8") as f:
-            lines = f.read().splitlines()
-        return [json.loads(x) for x in lines[-n:]]
\ No newline at end of file
+    @classmethod
+    def tail(cls, n: int = 20) -> List[dict]:
+        """Last `n` events, newest last; continues into rotated files when needed."""
+        cls.flush()
+        path = cls.path()
+        lines: List[str] = []
+        for f in [path] + rotated_files(path)[::-1]:
+            if len(lines) >= n:
+                break
+            if os.path.exists(f):
+                lines = tail_lines(f, n - len(lines)) + lines
+        return [json.loads(x) for x in lines[-n:]] if n > 0 else []
+
+    @classmethod
+    def query(cls, decision: Optional[str] = None, chunk_hash: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, limit: int = 100,
+              use_index: Optional[bool] = None) -> List[dict]:
+        """
+        Most recent matching events (oldest first). Uses the sidecar AuditIndex
+        when `use_index` is set (default: when the sidecar already exists),
+        otherwise streams the log files.
+        """
+        cls.flush()
+        path = cls.path()
+        if use_index is None:
+            use_index = os.path.exists(path + ".idx")
+        if use_index:
+            return AuditIndex(path).query(decision=decision, chunk_hash=chunk_hash, since=since, until=until, limit=limit)
+        found: "deque[dict]" = deque(maxlen=max(0, int(limit)))
+        for f in rotated_files(path) + [path]:
+            if not os.path.exists(f):
+                continue
+            for _, raw in _iter_lines(f):
+                try:
+                    ev = json.loads(raw)
+                except Exception:
+                    continue
+                ts = ev.get("ts") or 0
+                if ((since is None or ts >= since) and (until is None or ts <= until) and
+                        any((decision is None or d == decision) and (chunk_hash is None or h == chunk_hash)
+                            for d, h in _index_keys(ev))):
+                    found.append(ev)
+        return sorted(found, key=lambda e: e.get("ts") or 0)
\ No newline at end of file
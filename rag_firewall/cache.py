@@ -0,0 +1,202 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+"""Bounded caches used on the retrieval hot path.
+
+`LRUCache` is a small thread-safe LRU/TTL map. The findings caches built on it
+memoize scanner output per chunk, keyed by content hash plus a fingerprint of
+the scanner configuration, so policy edits never invalidate them.
+"""
+from __future__ import annotations
+import hashlib, json, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU map with optional per-entry TTL (seconds) and hit/miss counters."""
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = None):
+        self.maxsize = max(1, int(maxsize)); self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0; self.misses = 0; self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getstate__(self):
+        state = self.__dict__.copy(); del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state); self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._data)}
+
+
+def _normalize(value: Any) -> Any:
+    if hasattr(value, "pattern") and hasattr(value, "flags"):  # compiled regex
+        return ["re", value.pattern, int(value.flags)]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0])) if not str(k).startswith("_")}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(v) for v in value), key=repr)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "__dict__"):
+        return [type(value).__qualname__, _normalize(vars(value))]
+    return repr(value)
+
+
+def scanner_fingerprint(scanners) -> str:
+    """Stable digest of scanner classes and their configuration (patterns, lists, thresholds)."""
+    payload = [[type(s).__module__ + "." + type(s).__qualname__, _normalize(vars(s) if hasattr(s, "__dict__") else {})]
+               for s in scanners]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=repr).encode("utf-8")).hexdigest()[:16]
+
+
+class FindingsCache:
+    """Interface for findings caches: `get(key)` returns per-scanner findings or None."""
+    def get(self, key: str) -> Optional[List[List[dict]]]:
+        raise NotImplementedError
+
+    def set(self, key: str, findings: List[List[dict]]) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class MemoryFindingsCache(FindingsCache):
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = None):
+        self._lru = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        value = self._lru.get(key)
+        # hand out copies so callers can annotate findings without poisoning the cache
+        return None if value is None else [[dict(f) for f in res] for res in value]
+
+    def set(self, key, findings):
+        self._lru.set(key, tuple(tuple(dict(f) for f in res) for res in findings))
+
+    def stats(self):
+        return self._lru.stats()
+
+
+class SQLiteFindingsCache(FindingsCache):
+    """On-disk findings cache shared across processes; LRU by last access, optional TTL."""
+    _EVICT_EVERY = 64
+
+    def __init__(self, path: str = "ragfw_cache.sqlite", maxsize: int = 100000, ttl: Optional[float] = None):
+        self.path = path; self.maxsize = max(1, int(maxsize)); self.ttl = ttl
+        self.hits = 0; self.misses = 0; self.evictions = 0
+        self._lock = threading.Lock(); self._con = None; self._writes = 0
+        with self._lock:
+            self._connect().execute("CREATE TABLE IF NOT EXISTS findings_cache (key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)")
+            self._con.execute("CREATE INDEX IF NOT EXISTS findings_cache_accessed ON findings_cache(accessed)")
+            self._con.commit()
+
+    def _connect(self):
+        if self._con is None:
+            self._con = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("PRAGMA synchronous=NORMAL")
+        return self._con
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            con = self._connect()
+            row = con.execute("SELECT value, created FROM findings_cache WHERE key=?", (key,)).fetchone()
+            if row and (not self.ttl or now - row[1] < self.ttl):
+                con.execute("UPDATE findings_cache SET accessed=? WHERE key=?", (now, key))
+                self.hits += 1
+                return json.loads(row[0])
+            if row:
+                con.execute("DELETE FROM findings_cache WHERE key=?", (key,))
+            self.misses += 1
+            return None
+
+    def set(self, key, findings):
+        now = time.time()
+        with self._lock:
+            con = self._connect()
+            con.execute("INSERT OR REPLACE INTO findings_cache(key, value, created, accessed) VALUES (?,?,?,?)",
+                        (key, json.dumps(findings), now, now))
+            self._writes += 1
+            if self._writes % self._EVICT_EVERY == 0:
+                self._evict(con, now)
+
+    def _evict(self, con, now):
+        if self.ttl:
+            self.evictions += con.execute("DELETE FROM findings_cache WHERE created<?", (now - self.ttl,)).rowcount
+        (count,) = con.execute("SELECT COUNT(*) FROM findings_cache").fetchone()
+        if count > self.maxsize:
+            self.evictions += con.execute(
+                "DELETE FROM findings_cache WHERE key IN (SELECT key FROM findings_cache ORDER BY accessed LIMIT ?)",
+                (count - self.maxsize,)).rowcount
+
+    def close(self):
+        with self._lock:
+            if self._con is not None:
+                self._con.close(); self._con = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy(); state["_con"] = None; del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state); self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            (size,) = self._connect().execute("SELECT COUNT(*) FROM findings_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": size}
+
+
+def findings_cache_from_config(cfg: Optional[dict]) -> Optional[FindingsCache]:
+    """Build a findings cache from the `cache:` section of firewall.yaml."""
+    if not cfg or not cfg.get("enabled", True):
+        return None
+    backend = cfg.get("backend", "memory")
+    if backend == "memory":
+        return MemoryFindingsCache(maxsize=cfg.get("maxsize", 10000), ttl=cfg.get("ttl"))
+    if backend == "sqlite":
+        return SQLiteFindingsCache(path=cfg.get("path", "ragfw_cache.sqlite"), maxsize=cfg.get("maxsize", 100000), ttl=cfg.get("ttl"))
+    raise ValueError(f"unknown cache backend {backend!r}; expected 'memory' or 'sqlite'")
@@ -1,43 +1,105 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright (c) 2025 Tal Adari
 
-import argparse, os, glob
+import argparse, json, os, sys, time
 from rag_firewall import Firewall
-from rag_firewall.provenance import Hasher, ProvenanceStore
+from rag_firewall.provenance import ProvenanceStore
+from rag_firewall.provenance.indexer import CorpusIndexer
 from rag_firewall.audit import Audit
+from rag_firewall.corpus import DEFAULT_OVERLAP, iter_documents
 
 def cmd_index(args):
-    store=ProvenanceStore(args.store); files=glob.glob(os.path.join(args.path,'**/*'), recursive=True); count=0
-    for f in files:
-        if os.path.isdir(f): continue
-        try:
-            text=open(f,'r',encoding='utf-8').read()
-            h=Hasher.hash_text(text); store.record(hash=h, source=args.source, sensitivity=args.sensitivity); count+=1
-        except Exception: pass
-    print(f'Indexed {count} files into {args.store}')
+    store=ProvenanceStore(args.store)
+    indexer=CorpusIndexer(store, source=args.source, sensitivity=args.sensitivity, workers=args.workers,
+                          batch_size=args.batch_size, incremental=not args.full)
+    report=None if args.quiet else (lambda st: print(f'... {st.line()}', file=sys.stderr, flush=True))
+    try:
+        stats=indexer.run(args.path, progress=report)
+    finally:
+        store.close()
+    print(f'Indexed {stats.indexed} files into {args.store} ({stats.line()}, {stats.elapsed:.1f}s)')
+
+def _query_record(doc):
+    md=doc['metadata']; r=md['_ragfw']
+    rec={'source':md.get('source'),'hash':md.get('hash')}
+    if 'chunk' in md: rec.update(chunk=md['chunk'],offset=md['offset'])
+    rec.update(decision=r['decision'],score=r['score'],reasons=r['reasons'],policy=r['policy'],findings=r['findings'])
+    return rec
 
 def cmd_query(args):
-    fw=Firewall.from_yaml(args.config); docs=[]
-    for f in glob.glob(os.path.join(args.docs,'**/*'), recursive=True):
-        if os.path.isdir(f): continue
-        try:
-            text=open(f,'r',encoding='utf-8').read()
-            docs.append({'page_content':text,'metadata':{'source':f,'hash':Hasher.hash_text(text)}})
-        except Exception: pass
-    safe=[]
-    for d in docs:
-        dec, findings = fw.decide(d, base_score=1.0, context={'query':args.query})
-        if dec.get('action')!='deny': safe.append(d)
-        if args.show_decisions: print(dec)
-    print(f'Safe docs: {len(safe)} / {len(docs)}')
-    for ev in Audit.tail(10): print(ev)
+    fw=Firewall.from_yaml(args.config)
+    if args.workers is None: executor, workers = fw.executor, fw.max_workers
+    elif args.workers<=1: executor, workers = 'serial', 1
+    else: executor, workers = args.executor or (fw.executor if fw.executor!='serial' else 'process'), args.workers
+    out=open(args.out,'w',encoding='utf-8') if args.out else sys.stdout
+    errors=[]
+    def failed(path, exc):
+        errors.append(path)
+        if args.jsonl: out.write(json.dumps({'source':path,'error':f'{type(exc).__name__}: {exc}'})+'\n')
+    docs=iter_documents(args.docs, chunk_size=args.chunk_size, overlap=args.overlap, on_error=failed)
+    total=safe=0
+    try:
+        # docs are read lazily and at most workers*4 are in flight, so memory stays flat on any corpus size
+        for d in fw.iter_evaluate(docs, base_score=1.0, context={'query':args.query}, executor=executor,
+                                  max_workers=workers, max_pending=(workers or os.cpu_count() or 1)*4):
+            total+=1
+            if d['metadata']['_ragfw']['decision']!='deny': safe+=1
+            if args.jsonl: out.write(json.dumps(_query_record(d),default=str)+'\n')
+            elif args.show_decisions:
+                r=d['metadata']['_ragfw']; print({'action':r['decision'],'score':r['score'],'reasons':r['reasons'],'policy':r['policy']})
+    finally:
+        fw.close()
+        if out is not sys.stdout: out.close()
+    unit='chunks' if args.chunk_size else 'docs'
+    summary=f'Safe {unit}: {safe} / {total}'+(f' ({len(errors)} unreadable files skipped)' if errors else '')
+    if args.jsonl:
+        print(summary, file=sys.stderr)
+    else:
+        print(summary)
+        for ev in Audit.tail(10): print(ev)
+
+def cmd_audit(args):
+    if args.log: Audit.configure(path=args.log)
+    since=time.time()-args.within if args.within else None
+    for ev in Audit.query(decision=args.decision, chunk_hash=args.hash, since=since, limit=args.limit, use_index=True if args.index else None):
+        print(json.dumps(ev))
+
+def cmd_domains(args):
+    from .scanners.domains import read_domain_file, write_domain_list
+    n=write_domain_list((d for path in args.inputs for d in read_domain_file(path)), args.out)
+    print(f"Compiled {n} domains into {args.out}")
+
+def cmd_bench(args):
+    from . import bench
+    result=bench.run(suites=args.suite or bench.SUITES, sizes=[bench.parse_size(x) for x in args.sizes.split(',')],
+                     repeat=args.repeat, min_time=args.min_time, seed=args.seed)
+    for r in result['results']:
+        rate=next((f'{k}={r[k]:.3g}' for k in ('mb_per_s','us_per_call','ms_per_call','ops_per_s') if k in r),'')
+        print(f"{r['suite']:9} {r['name']:28} {json.dumps(r['params'])} {rate}")
+    if args.out:
+        with open(args.out,'w',encoding='utf-8') as f: json.dump(result,f,indent=2)
+        print(f'Wrote {len(result["results"])} results to {args.out}')
+    if args.compare:
+        with open(args.compare,'r',encoding='utf-8') as f: baseline=json.load(f)
+        slower=bench.compare(baseline,result,args.threshold)
+        for r in slower: print(f"REGRESSION {r['suite']} {r['name']} {json.dumps(r['params'])} x{r['ratio']:.2f}")
+        if slower: raise SystemExit(1)
 
 def main():
     p=argparse.ArgumentParser('ragfw'); sub=p.add_subparsers(dest='cmd')
-    p1=sub.add_parser('index'); p1.add_argument('path'); p1.add_argument('--store',default='prov.sqlite'); p1.add_argument('--source',default='uploads'); p1.add_argument('--sensitivity',default='low'); p1.set_defaults(func=cmd_index)
-    p2=sub.add_parser('query'); p2.add_argument('query'); p2.add_argument('--docs',default='./docs'); p2.add_argument('--config',default='firewall.yaml'); p2.add_argument('--store',default='prov.sqlite'); p2.add_argument('--show-decisions',action='store_true'); p2.set_defaults(func=cmd_query)
+    p1=sub.add_parser('index'); p1.add_argument('path'); p1.add_argument('--store',default='prov.sqlite'); p1.add_argument('--source',default='uploads'); p1.add_argument('--sensitivity',default='low'); p1.add_argument('--workers',type=int); p1.add_argument('--batch-size',type=int,default=500); p1.add_argument('--full',action='store_true',help='re-hash files even if size/mtime are unchanged'); p1.add_argument('--quiet',action='store_true',help='no progress lines on stderr'); p1.set_defaults(func=cmd_index)
+    p2=sub.add_parser('query'); p2.add_argument('query'); p2.add_argument('--docs',default='./docs'); p2.add_argument('--config',default='firewall.yaml'); p2.add_argument('--store',default='prov.sqlite'); p2.add_argument('--show-decisions',action='store_true'); p2.add_argument('--workers',type=int,help='scan on N workers (process pool unless --executor thread)'); p2.add_argument('--executor',choices=['thread','process']); p2.add_argument('--chunk-size',type=int,help='split files into overlapping windows of at most this many bytes'); p2.add_argument('--overlap',type=int,help='bytes shared by neighbouring windows (default: 1024, at most half of --chunk-size); matches up to this long are never split'); p2.add_argument('--jsonl',action='store_true',help='one JSON record per chunk (summary on stderr)'); p2.add_argument('--out',help='write records here instead of stdout'); p2.set_defaults(func=cmd_query)
+    p3=sub.add_parser('audit'); p3.add_argument('--log',default=None); p3.add_argument('--decision'); p3.add_argument('--hash'); p3.add_argument('--within',type=float,help='only events from the last N seconds'); p3.add_argument('--limit',type=int,default=20); p3.add_argument('--index',action='store_true',help='build/use the <log>.idx sidecar index'); p3.set_defaults(func=cmd_audit)
+    p4=sub.add_parser('domains',help='compile text domain lists into the memory-mapped format'); p4.add_argument('inputs',nargs='+'); p4.add_argument('--out',required=True); p4.set_defaults(func=cmd_domains)
+    p5=sub.add_parser('bench',help='run the benchmark suites and write JSON results'); p5.add_argument('--suite',action='append',choices=['scanners','policies','graph','io','baseline'],help='repeatable; default: all'); p5.add_argument('--sizes',default='1k,64k,1m'); p5.add_argument('--repeat',type=int,default=3); p5.add_argument('--min-time',type=float,default=0.05); p5.add_argument('--seed',type=int,default=0); p5.add_argument('--out'); p5.add_argument('--compare',help='baseline JSON; exit 1 on regressions'); p5.add_argument('--threshold',type=float,default=1.25); p5.set_defaults(func=cmd_bench)
     args=p.parse_args(); 
     if not hasattr(args,'func'): p.print_help(); return
+    if args.cmd=='query':
+        # checked here: iter_documents only raises once the generator starts
+        if args.chunk_size is not None and args.chunk_size<=0: p.error('--chunk-size must be positive')
+        if args.overlap is None: args.overlap=DEFAULT_OVERLAP if args.chunk_size is None else min(DEFAULT_OVERLAP, args.chunk_size//2)
+        elif args.overlap<0: p.error('--overlap must not be negative')
+        elif args.chunk_size is not None and args.chunk_size<=args.overlap: p.error('--chunk-size must be larger than --overlap')
     args.func(args)
 
 if __name__=='__main__': main()
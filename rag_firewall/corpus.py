@@ -0,0 +1,104 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+"""Streaming document source for batch scans (`ragfw query`).
+
+``iter_documents()`` walks a directory and yields firewall docs one at a time,
+so a corpus is never held in memory as a whole. Files of ``mmap_threshold``
+bytes or more are memory-mapped instead of read.
+
+With ``chunk_size`` set, each file is cut into windows of at most that many
+bytes (aligned to UTF-8 character boundaries) that overlap by ``overlap``
+bytes. Any match no longer than the overlap therefore lies entirely inside at
+least one window. Chunk text is newline-normalised like a text-mode read, so a
+file that fits in one window hashes exactly as ``ragfw index`` recorded it.
+"""
+from __future__ import annotations
+import mmap, os
+from typing import Callable, Iterator, Optional
+
+from rag_firewall.provenance.hasher import Hasher
+from rag_firewall.provenance.indexer import walk
+
+DEFAULT_OVERLAP = 1024
+MMAP_THRESHOLD = 1 << 20
+
+
+def _normalize(text: str) -> str:
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _boundary(buf, i: int) -> int:
+    """Move i back onto the start of a UTF-8 character."""
+    n = len(buf)
+    while 0 < i < n and buf[i] & 0xC0 == 0x80:
+        i -= 1
+    return i
+
+
+def windows(buf, size: int, overlap: int = DEFAULT_OVERLAP) -> Iterator[tuple]:
+    """Yield (offset, bytes) windows of at most `size` bytes overlapping by about `overlap`."""
+    if size <= overlap:
+        raise ValueError("chunk size must be larger than the overlap")
+    n = len(buf); start = 0
+    while True:
+        end = n if start + size >= n else _boundary(buf, start + size)
+        if end <= start:  # a window smaller than one character
+            end = min(n, start + size)
+        yield start, buf[start:end]
+        if end >= n:
+            return
+        nxt = _boundary(buf, end - overlap)
+        if nxt <= start:  # overlap nearly as large as the window: advance one character
+            nxt = start + 1
+            while nxt < n and buf[nxt] & 0xC0 == 0x80:
+                nxt += 1
+        start = nxt
+
+
+def _doc(text: str, path: str, chunk: Optional[int] = None, offset: int = 0) -> dict:
+    text = _normalize(text)
+    md = {"source": path, "hash": Hasher.hash_text(text)}
+    if chunk is not None:
+        md["chunk"] = chunk; md["offset"] = offset
+    return {"page_content": text, "metadata": md}
+
+
+def _read(path: str, size: int, chunk_size: Optional[int], overlap: int, mmap_threshold: int) -> Iterator[dict]:
+    if size < mmap_threshold or size == 0:
+        with open(path, "rb") as f:
+            buf = f.read()
+        if chunk_size is None or len(buf) <= chunk_size:
+            yield _doc(buf.decode("utf-8"), path, 0 if chunk_size else None)
+            return
+        for i, (offset, part) in enumerate(windows(buf, chunk_size, overlap)):
+            yield _doc(part.decode("utf-8"), path, i, offset)
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if chunk_size is None or len(mm) <= chunk_size:
+            yield _doc(str(mm, "utf-8"), path, 0 if chunk_size else None)
+            return
+        for i, (offset, part) in enumerate(windows(mm, chunk_size, overlap)):
+            yield _doc(part.decode("utf-8"), path, i, offset)
+
+
+def iter_documents(root: str, chunk_size: Optional[int] = None, overlap: int = DEFAULT_OVERLAP,
+                   on_error: Optional[Callable[[str, Exception], None]] = None,
+                   mmap_threshold: int = MMAP_THRESHOLD) -> Iterator[dict]:
+    """
+    Yield {"page_content", "metadata": {"source", "hash"[, "chunk", "offset"]}}
+    for every UTF-8 file under root (a single file is accepted too). Files
+    that cannot be read or decoded are passed to on_error(path, exc) and
+    skipped; chunks already yielded from a file that fails later stay valid.
+    """
+    if chunk_size is not None and chunk_size <= overlap:
+        raise ValueError("chunk size must be larger than the overlap")
+    files = [(root, os.stat(root))] if os.path.isfile(root) else walk(root)
+    for path, st in files:
+        try:
+            yield from _read(path, st.st_size, chunk_size, overlap, mmap_threshold)
+        except (OSError, ValueError) as e:  # UnicodeDecodeError is a ValueError
+            if on_error is not None:
+                on_error(path, e)
@@ -1,17 +1,122 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright (c) 2025 Tal Adari
 
-import time
+import asyncio, functools, os, pickle, time, uuid
+import heapq
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from .audit import Audit, AuditEvent
 from .policies.engine import PolicyEngine
+from .scanners.plan import ScanPlan
+from .cache import findings_cache_from_config, scanner_fingerprint
+from .metrics import MetricsRegistry, metrics_from_config
+from .provenance.hasher import Hasher
+from .provenance.resolver import as_resolver
 try:
     import yaml
 except Exception: yaml=None
 
+EXECUTOR_MODES=("serial","thread","process")
+
+# process-pool workers receive the firewall once, at pool start-up
+_WORKER_FIREWALL=None
+
+def _init_worker(firewall):
+    global _WORKER_FIREWALL
+    _WORKER_FIREWALL=firewall
+
+# caller-supplied ProcessPoolExecutors never ran _init_worker: the firewall travels
+# with each task as a pickled snapshot and is unpickled once per worker (Firewall._snapshot)
+_WORKER_SNAPSHOTS={}
+
+def _worker_firewall(snapshot=None):
+    if snapshot is None:
+        return _WORKER_FIREWALL
+    token, blob = snapshot
+    fw=_WORKER_SNAPSHOTS.get(token)
+    if fw is None:
+        while len(_WORKER_SNAPSHOTS)>=4:
+            _WORKER_SNAPSHOTS.pop(next(iter(_WORKER_SNAPSHOTS)))
+        fw=_WORKER_SNAPSHOTS[token]=pickle.loads(blob)
+    return fw
+
+def _metrics_delta(fw):
+    # metrics recorded in this worker since the last chunk, merged by the parent (Firewall._merged)
+    m=fw.metrics
+    return m.drain() if isinstance(m, MetricsRegistry) else None
+
+def _evaluate_chunk(docs, base_score, context, snapshot=None):
+    # never audits: a worker's sink is a forked copy that may never be drained,
+    # so the parent logs each result from its _ragfw metadata (Firewall._adopt)
+    fw=_worker_firewall(snapshot)
+    mds=[d["metadata"] for d in fw._evaluate_batch(docs, base_score, context, audit=False)]
+    return mds, _metrics_delta(fw)
+
+def _decide_chunk(docs, base_score, context):
+    # like _evaluate_chunk: the flagged metadata travels back and the parent audits
+    rows=[(dec, findings, d["metadata"]) for d, (dec, findings)
+          in zip(docs, _WORKER_FIREWALL.decide_many(docs, base_score, context, audit=False))]
+    return rows, _metrics_delta(_WORKER_FIREWALL)
+
+def _remote(executor):
+    return executor == "process" or isinstance(executor, ProcessPoolExecutor)
+
+def _payload(doc):
+    return {"page_content": doc.get("page_content"), "metadata": doc.get("metadata", {}) or {}}
+
+def _qualifies(doc, min_score):
+    r = doc["metadata"]["_ragfw"]
+    return r["decision"] != "deny" and (min_score is None or r["score"] >= min_score)
+
 class Firewall:
-    def __init__(self, scanners=None, policies=None, policy_engine=None):
+    def __init__(self, scanners=None, policies=None, policy_engine=None, merge_patterns=False, executor="serial", max_workers=None, cache=None,
+                 short_circuit=False, full_findings=False, metrics=None):
         self.scanners=scanners or []
         self.policy_engine=policy_engine or PolicyEngine(policies or [])
+        self.merge_patterns=merge_patterns
+        self.executor=executor; self.max_workers=max_workers
+        # findings cache (see rag_firewall.cache); only text-only scanners are cached
+        self.cache=cache
+        # short_circuit: stop scanning (and skip policies) once a deny is certain;
+        # full_findings keeps every scanner running and only skips the policy pass
+        self.short_circuit=short_circuit; self.full_findings=full_findings
+        # optional rag_firewall.metrics backend; None keeps the hot path uninstrumented
+        self.metrics=metrics
+        if metrics is not None:
+            if getattr(self.policy_engine, "metrics", False) is None:
+                self.policy_engine.metrics=metrics
+            self._register_gauges(metrics)
+        self._pools={}
+        self._compile()
+
+    def _compile(self):
+        # compile every pattern-based scanner into one plan, matched once per chunk
+        self.plan=ScanPlan(self.scanners, merge=self.merge_patterns)
+        self._cacheable=[i for i, s in enumerate(self.scanners) if getattr(s, "cacheable", False)]
+        self._fingerprint=scanner_fingerprint([self.scanners[i] for i in self._cacheable])
+        self._labels=[(("scanner", type(s).__name__),) for s in self.scanners]
+        # short-circuit order: scanners that can force a deny first, then by cost
+        self._order=sorted(range(len(self.scanners)),
+                           key=lambda i: (not getattr(self.scanners[i], "auto_deny", False), getattr(self.scanners[i], "cost", 10)))
+
+    def __getstate__(self):
+        state=self.__dict__.copy(); state["_pools"]={}
+        return state
+
+    def _register_gauges(self, metrics):
+        cache=self.cache
+        if cache is not None:
+            def ratio():
+                st=cache.stats(); total=st.get("hits",0)+st.get("misses",0)
+                return st.get("hits",0)/total if total else 0.0
+            metrics.gauge("ragfw_cache_hits", lambda: cache.stats().get("hits",0))
+            metrics.gauge("ragfw_cache_misses", lambda: cache.stats().get("misses",0))
+            metrics.gauge("ragfw_cache_hit_ratio", ratio)
+        metrics.gauge("ragfw_audit_queue_depth", lambda: getattr(Audit.sink(), "depth", 0))
+
+    def close(self):
+        """Shut down any worker pools started by evaluate()."""
+        pools, self._pools = self._pools, {}
+        for pool in pools.values(): pool.shutdown(wait=True)
 
     @classmethod
     def from_yaml(cls, path):
@@ -31,26 +136,136 @@ class Firewall:
             elif t=="pii":
                 if s.get("enabled", True): scanners.append(PIIScanner())
             elif t=="secrets": scanners.append(SecretsScanner(extra_patterns=s.get("extra_patterns")))
-            elif t=="encoded": scanners.append(EncodedContentScanner(min_len=s.get("min_len",200), ratio_threshold=s.get("ratio_threshold",0.35)))
-            elif t=="url": scanners.append(URLScanner(allowlist=s.get("allowlist"), denylist=s.get("denylist")))
+            elif t=="encoded": scanners.append(EncodedContentScanner(min_len=s.get("min_len",200), ratio_threshold=s.get("ratio_threshold",0.35),
+                                                                   entropy_threshold=s.get("entropy_threshold"), entropy_window=s.get("entropy_window",256)))
+            elif t=="url": scanners.append(URLScanner(allowlist=s.get("allowlist"), denylist=s.get("denylist"),
+                                                       allowlist_file=s.get("allowlist_file"), denylist_file=s.get("denylist_file")))
             elif t=="conflict": scanners.append(ConflictScanner(stale_days=s.get("stale_days",180)))
         policies=cfg.get("policies",[])
-        return cls(scanners=scanners, policies=policies)
+        if cfg.get("audit"): Audit.configure(**cfg["audit"])
+        ex=cfg.get("executor") or {}; plan=cfg.get("scan_plan") or {}
+        return cls(scanners=scanners, policies=policies, merge_patterns=bool(plan.get("merge", False)),
+                   executor=ex.get("mode","serial"), max_workers=ex.get("max_workers"), cache=findings_cache_from_config(cfg.get("cache")),
+                   short_circuit=bool(plan.get("short_circuit", False)), full_findings=bool(plan.get("full_findings", False)),
+                   metrics=metrics_from_config(cfg.get("metrics")))
 
     def scan(self, doc):
-        findings=[]
-        for s in self.scanners:
+        return self._scan(doc)[0]
+
+    def _scan(self, doc):
+        """Returns (findings, certain_deny); certain_deny is only computed when short-circuiting."""
+        text=doc.get("page_content","") or ""
+        if self.plan.scanners!=self.scanners:  # scanners were swapped after construction
+            self._compile()
+        per_scanner=[None]*len(self.scanners)
+        key=None
+        if self.cache is not None and self._cacheable:
+            # always hash the text itself: metadata["hash"] is caller-supplied and may be stale or shared by chunks
+            key=f"{Hasher.hash_text(text)}:{self._fingerprint}"
+            cached=self.cache.get(key)
+            if cached is not None and len(cached)==len(self._cacheable):
+                for i, res in zip(self._cacheable, cached): per_scanner[i]=res
+                key=None
+        certain=getattr(self.policy_engine, "certain_deny", None) if self.short_circuit else None
+        early=certain is not None and not self.full_findings
+        metrics=self.metrics
+        hits=None
+        if early:
+            hits=self.plan.lazy(text)  # patterns are matched lazily, scanner by scanner
+        elif any(per_scanner[i] is None and self.plan.planned(i) for i in range(len(self.scanners))):
+            t0=time.perf_counter() if metrics is not None else 0.0
             try:
-                res=s.scan(doc.get("page_content",""), doc.get("metadata",{}))
-                if res: findings.extend(res)
-            except Exception as e:
-                findings.append({"scanner":"error","error":str(e)})
-        return findings
+                hits=self.plan.match(text)
+            except Exception:
+                hits=None
+            if metrics is not None:
+                metrics.observe("ragfw_scan_plan_seconds", time.perf_counter()-t0)
+        errored=False; denied=False
+        for i in (self._order if early else range(len(self.scanners))):
+            if per_scanner[i] is None:
+                s=self.scanners[i]
+                t0=time.perf_counter() if metrics is not None else 0.0
+                try:
+                    if hits is not None and self.plan.planned(i):
+                        res=self.plan.findings_lazy(i, hits) if early else self.plan.findings_for(i, hits)
+                    else:
+                        res=s.scan(doc.get("page_content",""), doc.get("metadata",{}))
+                    per_scanner[i]=res or []
+                except Exception as e:
+                    per_scanner[i]=[{"scanner":"error","error":str(e)}]
+                    errored=errored or i in self._cacheable
+                if metrics is not None:
+                    labels=self._labels[i]
+                    metrics.observe("ragfw_scanner_seconds", time.perf_counter()-t0, labels)
+                    metrics.inc("ragfw_scanned_chars_total", len(text), labels)
+                    if per_scanner[i]:
+                        metrics.inc("ragfw_scanner_findings_total", len(per_scanner[i]), labels)
+            if early and certain(per_scanner[i]):
+                denied=True
+                break
+        if key is not None and not errored and all(per_scanner[i] is not None for i in self._cacheable):
+            self.cache.set(key, [per_scanner[i] for i in self._cacheable])
+        findings=[f for res in per_scanner if res for f in res]
+        if certain is not None and not early:
+            denied=certain(findings)
+        return findings, denied
+
+    @staticmethod
+    def _auto_denied(base_score):
+        return {"action": "deny", "score": base_score, "reasons": ["scanner:auto-deny"], "policy": None}
 
     def decide(self, doc, base_score=1.0, context=None):
+        metrics = self.metrics
+        t0 = time.perf_counter() if metrics is not None else 0.0
+        context = context or {}
+        findings, denied = self._scan(doc)
+        self._flag(doc, findings)
+        if denied:
+            decision = self._auto_denied(base_score)
+        else:
+            decision = self.policy_engine.evaluate(doc, findings, context, base_score)
+        self._audit(doc, decision, findings, base_score)
+        if metrics is not None:
+            metrics.observe("ragfw_decide_seconds", time.perf_counter() - t0)
+            metrics.inc("ragfw_decisions_total", 1, (("action", decision.get("action", "allow")),))
+        return decision, findings
+
+    def decide_many(self, docs, base_score=1.0, context=None, audit=True):
+        """
+        decide() for a batch: scan every doc, then run the policy engine once over
+        the whole batch (single reference time, vectorized rerank scoring).
+        base_score may be a scalar or one value per doc. audit=False skips the
+        per-doc audit events, for callers that log the batch themselves.
+        Returns [(decision, findings), ...] in input order.
+        """
+        metrics = self.metrics
+        t0 = time.perf_counter() if metrics is not None else 0.0
         context = context or {}
-        findings = self.scan(doc)
+        bases = list(base_score) if isinstance(base_score, (list, tuple)) else [base_score] * len(docs)
+        scanned = [self._scan(d) for d in docs]
+        findings_list = [f for f, _ in scanned]
+        for d, findings in zip(docs, findings_list):
+            self._flag(d, findings)
+        decisions = [self._auto_denied(b) if denied else None for (_, denied), b in zip(scanned, bases)]
+        todo = [i for i, dec in enumerate(decisions) if dec is None]
+        if hasattr(self.policy_engine, "evaluate_batch"):
+            rest = self.policy_engine.evaluate_batch([docs[i] for i in todo], [findings_list[i] for i in todo],
+                                                     context, [bases[i] for i in todo])
+        else:
+            rest = [self.policy_engine.evaluate(docs[i], findings_list[i], context, bases[i]) for i in todo]
+        for i, dec in zip(todo, rest):
+            decisions[i] = dec
+        if audit:
+            for d, decision, findings, b in zip(docs, decisions, findings_list, bases):
+                self._audit(d, decision, findings, b)
+        if metrics is not None and docs:
+            metrics.observe("ragfw_decide_batch_seconds", time.perf_counter() - t0)
+            for decision in decisions:
+                metrics.inc("ragfw_decisions_total", 1, (("action", decision.get("action", "allow")),))
+        return list(zip(decisions, findings_list))
 
+    @staticmethod
+    def _flag(doc, findings):
         # NEW: enrich metadata with easy-to-match flags
         has_secrets = any(f.get("scanner") == "secrets" for f in findings)
         has_high_findings = any(f.get("severity") == "high" for f in findings)
@@ -59,8 +274,8 @@ class Firewall:
         md["has_high_findings"] = has_high_findings
         doc["metadata"] = md
 
-        decision = self.policy_engine.evaluate(doc, findings, context, base_score)
-
+    @staticmethod
+    def _audit(doc, decision, findings, base_score):
         Audit.log(AuditEvent(
             ts=time.time(),
             chunk_hash=doc.get("metadata", {}).get("hash"),
@@ -71,10 +286,29 @@ class Firewall:
             policy=decision.get("policy"),
         ))
 
-        return decision, findings
+    def _snapshot(self):
+        """(token, pickled self) for process pools the firewall did not start itself."""
+        return uuid.uuid4().hex, pickle.dumps(self)
 
-    def evaluate_one(self, doc, base_score: float = 1.0, context: dict | None = None):
-        dec, findings = self.decide(doc, base_score=base_score, context=context)
+    def _merged(self, result):
+        """Unpack a process worker's (payload, metrics delta), folding the delta into self.metrics."""
+        payload, delta = result
+        if delta and isinstance(self.metrics, MetricsRegistry):
+            self.metrics.merge(delta)
+        return payload
+
+    @staticmethod
+    def _adopt(doc, md, audit=True):
+        """Copy a process worker's result onto `doc` and audit it in this process."""
+        doc["metadata"] = md
+        if audit:
+            r = md["_ragfw"]
+            Audit.log(AuditEvent(ts=time.time(), chunk_hash=md.get("hash"), decision=r["decision"], score=r["score"],
+                                 reasons=r["reasons"], findings=r["findings"], policy=r["policy"]))
+        return doc
+
+    @staticmethod
+    def _attach(doc, dec, findings):
         md = doc.get("metadata", {}) or {}
         md["_ragfw"] = {
             "decision": dec.get("action", "allow"),
@@ -86,26 +320,271 @@ class Firewall:
         doc["metadata"] = md
         return doc
 
-    def evaluate(self, docs: list[dict], base_score: float = 1.0, context: dict | None = None) -> list[dict]:
-        out = []
-        for d in docs:
-            out.append(self.evaluate_one(d, base_score=base_score, context=context))
-        return out
+    def evaluate_one(self, doc, base_score: float = 1.0, context: dict | None = None):
+        dec, findings = self.decide(doc, base_score=base_score, context=context)
+        return self._attach(doc, dec, findings)
+
+    def _evaluate_batch(self, docs, base_score, context, audit=True):
+        return [self._attach(d, dec, findings) for d, (dec, findings) in zip(docs, self.decide_many(docs, base_score, context, audit))]
+
+    def evaluate(self, docs: list[dict], base_score: float = 1.0, context: dict | None = None,
+                 executor=None, max_workers: int | None = None, chunksize: int | None = None, audit: bool = True) -> list[dict]:
+        """
+        Evaluate a batch of docs; output order always matches input order.
+        executor: "serial", "thread", "process" or a concurrent.futures.Executor
+        (defaults to the firewall's own setting). Pools are kept until close().
+        A ProcessPoolExecutor instance gets a snapshot of the firewall taken at
+        this call, unpickled once per worker.
+        Docs are dispatched to workers in chunks, each evaluated as one batch.
+        Process mode copies the resulting metadata back onto `docs` and writes
+        the audit events here, in the calling process; workers hold a snapshot
+        of the firewall taken when the pool started.
+        audit=False leaves auditing to the caller (e.g. one event per subgraph).
+        """
+        docs = list(docs)
+        executor = executor or self.executor or "serial"
+        if executor == "serial" or len(docs) < 2:
+            return self._evaluate_batch(docs, base_score, context, audit)
+        if not isinstance(executor, Executor) and executor not in EXECUTOR_MODES:
+            raise ValueError(f"unknown executor {executor!r}; expected one of {EXECUTOR_MODES}")
+        workers = max_workers or self.max_workers or os.cpu_count() or 1
+        size = chunksize or max(1, -(-len(docs) // (workers * 4)))
+        chunks = [docs[i:i+size] for i in range(0, len(docs), size)]
+        if not _remote(executor):
+            pool = executor if isinstance(executor, Executor) else self._pool(executor, workers)
+            return [d for out in pool.map(lambda c: self._evaluate_batch(c, base_score, context, audit), chunks) for d in out]
+        pool = executor if isinstance(executor, Executor) else self._pool(executor, workers)
+        snapshot = self._snapshot() if isinstance(executor, Executor) else None
+        futures = [pool.submit(_evaluate_chunk, [_payload(d) for d in c], base_score, context, snapshot) for c in chunks]
+        for c, fut in zip(chunks, futures):
+            for d, md in zip(c, self._merged(fut.result())):
+                self._adopt(d, md, audit)
+        return docs
+
+    # --- streaming: yield each decision as soon as it is made ---
+    def iter_evaluate(self, docs, base_score: float = 1.0, context: dict | None = None, executor=None,
+                      max_workers: int | None = None, stop_after: int | None = None, min_score: float | None = None,
+                      max_pending: int | None = None):
+        """
+        Yield evaluated docs as each one finishes: in input order when serial
+        (docs may be a lazy iterable), in completion order on a pool.
+        With stop_after=k, stop once k allowed docs scoring >= min_score have
+        been yielded; work not yet started is cancelled. Closing the generator
+        early cancels pending work as well.
+        max_pending caps the docs submitted to a pool but not yet yielded, so a
+        lazy iterable is consumed as results come back (bounded memory).
+        """
+        executor = executor or self.executor or "serial"
+        if executor == "serial":
+            found = 0
+            for d in docs:
+                out = self.evaluate_one(d, base_score=base_score, context=context)
+                yield out
+                if stop_after is not None and _qualifies(out, min_score):
+                    found += 1
+                    if found >= stop_after:
+                        return
+            return
+        if not isinstance(executor, Executor) and executor not in EXECUTOR_MODES:
+            raise ValueError(f"unknown executor {executor!r}; expected one of {EXECUTOR_MODES}")
+        remote = _remote(executor)
+        pool = executor if isinstance(executor, Executor) else self._pool(executor, max_workers or self.max_workers or os.cpu_count() or 1)
+        snapshot = self._snapshot() if remote and isinstance(executor, Executor) else None
+        def submit(d):
+            if remote:
+                return pool.submit(_evaluate_chunk, [_payload(d)], base_score, context, snapshot)
+            return pool.submit(self.evaluate_one, d, base_score, context)
+        futures = {}
+        if max_pending is None:
+            futures.update((submit(d), d) for d in docs)
+            completed = ((fut, futures[fut]) for fut in as_completed(futures))
+        else:
+            completed = self._bounded(iter(docs), submit, futures, max(1, max_pending))
+        found = 0
+        try:
+            for fut, d in completed:
+                out = fut.result()
+                if remote:
+                    out = self._adopt(d, self._merged(out)[0])
+                yield out
+                if stop_after is not None and _qualifies(out, min_score):
+                    found += 1
+                    if found >= stop_after:
+                        return
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+    @staticmethod
+    def _bounded(docs, submit, futures, limit):
+        # keep at most `limit` futures in flight, refilling from `docs` as they complete
+        def refill():
+            for d in docs:
+                futures[submit(d)] = d
+                if len(futures) >= limit:
+                    return
+        refill()
+        while futures:
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut, futures.pop(fut)
+            refill()
+
+    async def aiter_evaluate(self, docs, base_score: float = 1.0, context: dict | None = None,
+                             stop_after: int | None = None, min_score: float | None = None):
+        """Async iterator counterpart of iter_evaluate() on the firewall's worker pool."""
+        loop = asyncio.get_running_loop()
+        mode, pool = self._async_pool()
+        docs = list(docs)
+        if mode == "process":
+            futs = [loop.run_in_executor(pool, _evaluate_chunk, [_payload(d)], base_score, context) for d in docs]
+        else:
+            futs = [loop.run_in_executor(pool, self.evaluate_one, d, base_score, context) for d in docs]
+        owner = {f: d for f, d in zip(futs, docs)}
+        order = {f: i for i, f in enumerate(futs)}  # O(1) input position for ties
+        pending = set(futs); found = 0
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in sorted(done, key=order.__getitem__):
+                    out = fut.result()
+                    if mode == "process":
+                        out = self._adopt(owner[fut], self._merged(out)[0])
+                    yield out
+                    if stop_after is not None and _qualifies(out, min_score):
+                        found += 1
+                        if found >= stop_after:
+                            return
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+    # --- asyncio API: CPU-bound work runs on the firewall's worker pool ---
+    def _async_pool(self):
+        mode = "process" if self.executor == "process" else "thread"
+        return mode, self._pool(mode, self.max_workers or os.cpu_count() or 1)
+
+    async def adecide(self, doc, base_score=1.0, context=None):
+        """decide() without blocking the event loop (scanning, policies and audit run off-loop)."""
+        loop = asyncio.get_running_loop()
+        mode, pool = self._async_pool()
+        if mode == "process":
+            return (await self._adecide_remote(loop, pool, [doc], base_score, context))[0]
+        return await loop.run_in_executor(pool, functools.partial(self.decide, doc, base_score, context))
+
+    async def adecide_many(self, docs, base_score=1.0, context=None):
+        loop = asyncio.get_running_loop()
+        mode, pool = self._async_pool()
+        if mode == "process":
+            return await self._adecide_remote(loop, pool, list(docs), base_score, context)
+        return await loop.run_in_executor(pool, functools.partial(self.decide_many, list(docs), base_score, context))
+
+    async def _adecide_remote(self, loop, pool, docs, base_score, context):
+        # workers decide on their snapshot; flags are copied back onto the caller's docs and audited here
+        out = self._merged(await loop.run_in_executor(pool, _decide_chunk, [_payload(d) for d in docs], base_score, context))
+        bases = list(base_score) if isinstance(base_score, (list, tuple)) else [base_score] * len(docs)
+        for d, (dec, findings, md), b in zip(docs, out, bases):
+            own = d.get("metadata", {}) or {}
+            own.update(md)
+            d["metadata"] = own
+            self._audit(d, dec, findings, b)
+        return [(dec, findings) for dec, findings, _ in out]
+
+    async def aevaluate(self, docs: list[dict], base_score: float = 1.0, context: dict | None = None,
+                        chunksize: int | None = None) -> list[dict]:
+        """
+        evaluate() for asyncio callers: chunks are evaluated concurrently on the
+        firewall's thread pool (or process pool when executor="process") and
+        awaited, so the loop keeps serving other queries meanwhile.
+        """
+        docs = list(docs)
+        if not docs:
+            return docs
+        loop = asyncio.get_running_loop()
+        mode, pool = self._async_pool()
+        workers = self.max_workers or os.cpu_count() or 1
+        size = chunksize or max(1, -(-len(docs) // workers))
+        chunks = [docs[i:i+size] for i in range(0, len(docs), size)]
+        if mode == "thread":
+            outs = await asyncio.gather(*[loop.run_in_executor(pool, self._evaluate_batch, c, base_score, context) for c in chunks])
+            return [d for out in outs for d in out]
+        outs = await asyncio.gather(*[loop.run_in_executor(pool, _evaluate_chunk, [_payload(d) for d in c], base_score, context)
+                                      for c in chunks])
+        for c, mds in zip(chunks, map(self._merged, outs)):
+            for d, md in zip(c, mds):
+                self._adopt(d, md)
+        return docs
+
+    def _pool(self, mode, workers):
+        key = (mode, workers)
+        pool = self._pools.get(key)
+        if pool is None:
+            if mode == "thread":
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ragfw")
+            else:
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,))
+            self._pools[key] = pool
+        return pool
 
 class _RetrieverWrapper:
     def __init__(self, retriever, firewall, provenance_store=None):
         self._inner=retriever; self.firewall=firewall; self.provenance=provenance_store
+        self._resolver=as_resolver(provenance_store)
+
+    def get_relevant_documents(self, query, top_k=None, min_score=None):
+        """
+        Safe docs sorted by score. With top_k, scanning stops once top_k allowed
+        docs scoring >= min_score are found and the best top_k (bounded heap) are
+        returned.
+        """
+        if top_k is not None:
+            return _top_k(self.stream_relevant_documents(query, top_k=top_k, min_score=min_score), top_k)
+        docs = self._inner.get_relevant_documents(query)
+        if self._resolver is not None:
+            self._resolver.enrich(docs)
+        return self._safe(self.firewall.evaluate(docs, base_score=1.0, context={"query": query}))
 
-    def get_relevant_documents(self, query):
+    def stream_relevant_documents(self, query, top_k=None, min_score=None):
+        """Yield safe docs as soon as each is decided (unsorted); see Firewall.iter_evaluate."""
         docs = self._inner.get_relevant_documents(query)
-        safe = []
-        for d in docs:
-            out = self.firewall.evaluate_one(d, base_score=1.0, context={"query": query})
-            if out["metadata"]["_ragfw"]["decision"] == "deny":
-                continue
-            safe.append(out)
+        if self._resolver is not None:
+            self._resolver.enrich(docs)
+        for d in self.firewall.iter_evaluate(docs, base_score=1.0, context={"query": query}, stop_after=top_k, min_score=min_score):
+            if d["metadata"]["_ragfw"]["decision"] != "deny":
+                yield d
+
+    async def astream_relevant_documents(self, query, top_k=None, min_score=None):
+        docs = await self._aget_inner(query)
+        if self._resolver is not None:
+            await self._resolver.aenrich(docs)
+        async for d in self.firewall.aiter_evaluate(docs, base_score=1.0, context={"query": query}, stop_after=top_k, min_score=min_score):
+            if d["metadata"]["_ragfw"]["decision"] != "deny":
+                yield d
+
+    async def aget_relevant_documents(self, query, top_k=None, min_score=None):
+        if top_k is not None:
+            return _top_k([d async for d in self.astream_relevant_documents(query, top_k=top_k, min_score=min_score)], top_k)
+        docs = await self._aget_inner(query)
+        if self._resolver is not None:
+            await self._resolver.aenrich(docs)
+        return self._safe(await self.firewall.aevaluate(docs, base_score=1.0, context={"query": query}))
+
+    async def _aget_inner(self, query):
+        if hasattr(self._inner, "aget_relevant_documents"):
+            return await self._inner.aget_relevant_documents(query)
+        return await asyncio.get_running_loop().run_in_executor(None, self._inner.get_relevant_documents, query)
+
+    @staticmethod
+    def _safe(docs):
+        safe = [d for d in docs if d["metadata"]["_ragfw"]["decision"] != "deny"]
         safe.sort(key=lambda x: x.get("metadata", {}).get("_ragfw", {}).get("score", 1.0), reverse=True)
         return safe
 
+def _top_k(docs, k):
+    """Best k docs by firewall score via a bounded heap; ties keep arrival order."""
+    score = lambda x: x[1]["metadata"]["_ragfw"]["score"]
+    best = heapq.nlargest(k, enumerate(docs), key=lambda x: (score(x), -x[0]))
+    return [d for _, d in best]
+
 def wrap_retriever(retriever, firewall, provenance_store=None):
     return _RetrieverWrapper(retriever, firewall, provenance_store)
@@ -0,0 +1,323 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+"""Columnar subgraph layout for large GraphRAG retrievals.
+
+``ColumnarSubgraph`` keeps a subgraph as parallel columns instead of one
+object per artifact:
+
+  node_ids / edge_ids      id lists (position = artifact index)
+  node_label / edge_type   int codes into one interned ``names`` table
+  node_ts / edge_ts        float arrays, NaN for "no timestamp"
+  edge_src / edge_dst      node indices; endpoints outside the subgraph are
+                           -(j + 1) into ``external_ids``
+  path_* pointers          flattened node/edge index lists per path
+  node_props / edge_props  lists of dicts, or ``LazyProps`` columns that
+                           build each props dict on access (nothing stored)
+
+Out-edges are available as CSR (``indptr``/``adj_edges``), built on first use.
+``nodes``/``edges``/``paths`` are read-only views that materialize
+GraphNode/GraphEdge/GraphPath objects on access, so serializers written for
+``Subgraph`` work unchanged. ``select()`` prunes with keep-masks; path
+membership is checked with NumPy when it is installed.
+"""
+from __future__ import annotations
+import math, sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from rag_firewall.graph.types import GraphEdge, GraphNode, GraphPath, Subgraph
+
+try:
+    import numpy as np
+except Exception: np = None
+
+_NAN = float("nan")
+
+
+class LazyProps:
+    """Props column built on access: props[i] == loader(keys[i]); nothing is cached."""
+    __slots__ = ("keys", "loader")
+
+    def __init__(self, keys: Sequence[Hashable], loader: Callable[[Hashable], Dict[str, Any]]):
+        self.keys = keys; self.loader = loader
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return self.loader(self.keys[i])
+
+    def take(self, idx: Iterable[int]) -> "LazyProps":
+        keys = self.keys
+        return LazyProps([keys[i] for i in idx], self.loader)
+
+
+def _take(col, idx: List[int]):
+    if isinstance(col, LazyProps):
+        return col.take(idx)
+    if isinstance(col, array):
+        return array(col.typecode, [col[i] for i in idx])
+    return [col[i] for i in idx]
+
+
+def _ts(value: Optional[float]) -> float:
+    return _NAN if value is None else float(value)
+
+
+def _ts_value(x: float) -> Optional[float]:
+    return None if math.isnan(x) else x
+
+
+class _NodeView(Mapping):
+    __slots__ = ("_sg",)
+
+    def __init__(self, sg: "ColumnarSubgraph"):
+        self._sg = sg
+
+    def __getitem__(self, nid):
+        return self._sg.node(self._sg.node_index[nid])
+
+    def __contains__(self, nid) -> bool:
+        return nid in self._sg.node_index
+
+    def __iter__(self):
+        return iter(self._sg.node_ids)
+
+    def __len__(self) -> int:
+        return len(self._sg.node_ids)
+
+
+class _EdgeView(Mapping):
+    __slots__ = ("_sg",)
+
+    def __init__(self, sg: "ColumnarSubgraph"):
+        self._sg = sg
+
+    def __getitem__(self, eid):
+        return self._sg.edge(self._sg.edge_index[eid])
+
+    def __contains__(self, eid) -> bool:
+        return eid in self._sg.edge_index
+
+    def __iter__(self):
+        return iter(self._sg.edge_ids)
+
+    def __len__(self) -> int:
+        return len(self._sg.edge_ids)
+
+
+class ColumnarSubgraph:
+    """Compact, read-mostly Subgraph; build it with from_columns() or from_subgraph()."""
+    __slots__ = ("names", "node_ids", "node_label", "node_ts", "node_props",
+                 "edge_ids", "edge_type", "edge_src", "edge_dst", "edge_ts", "edge_props", "external_ids",
+                 "path_node_ptr", "path_nodes", "path_edge_ptr", "path_edges", "meta",
+                 "_node_index", "_edge_index", "_csr")
+
+    def __init__(self, names, node_ids, node_label, node_ts, node_props,
+                 edge_ids, edge_type, edge_src, edge_dst, edge_ts, edge_props, external_ids,
+                 path_node_ptr, path_nodes, path_edge_ptr, path_edges, meta):
+        self.names = names
+        self.node_ids = node_ids; self.node_label = node_label; self.node_ts = node_ts; self.node_props = node_props
+        self.edge_ids = edge_ids; self.edge_type = edge_type; self.edge_src = edge_src; self.edge_dst = edge_dst
+        self.edge_ts = edge_ts; self.edge_props = edge_props; self.external_ids = external_ids
+        self.path_node_ptr = path_node_ptr; self.path_nodes = path_nodes
+        self.path_edge_ptr = path_edge_ptr; self.path_edges = path_edges
+        self.meta = meta
+        self._node_index = None; self._edge_index = None; self._csr = None
+
+    # --- construction ---
+    @classmethod
+    def from_columns(cls, node_ids: Sequence[Hashable], node_labels: Iterable[str], node_props,
+                     node_ts: Optional[Iterable[Optional[float]]] = None,
+                     edge_ids: Sequence[str] = (), edge_types: Iterable[str] = (),
+                     edge_src: Iterable[Hashable] = (), edge_dst: Iterable[Hashable] = (), edge_props=(),
+                     edge_ts: Optional[Iterable[Optional[float]]] = None,
+                     paths: Iterable[Tuple[Sequence[Hashable], Sequence[str]]] = (),
+                     meta: Optional[Dict[str, Any]] = None) -> "ColumnarSubgraph":
+        """
+        Build from per-kind columns. node_props/edge_props are lists of dicts
+        or LazyProps; endpoints and path members are given by id.
+        """
+        names: List[str] = []; codes: Dict[str, int] = {}
+        def code(name: str) -> int:
+            c = codes.get(name)
+            if c is None:
+                c = codes[name] = len(names); names.append(sys.intern(name))
+            return c
+        node_ids = list(node_ids); edge_ids = list(edge_ids)
+        index = {nid: i for i, nid in enumerate(node_ids)}
+        external: List[Hashable] = []; ext_index: Dict[Hashable, int] = {}
+        def endpoint(nid) -> int:
+            i = index.get(nid)
+            if i is not None:
+                return i
+            j = ext_index.get(nid)
+            if j is None:
+                j = ext_index[nid] = len(external); external.append(nid)
+            return -(j + 1)
+        edge_index = {eid: i for i, eid in enumerate(edge_ids)}
+        pn_ptr = array("i", [0]); pn = array("i"); pe_ptr = array("i", [0]); pe = array("i")
+        for p_nodes, p_edges in paths:
+            pn.extend(index.get(n, -1) for n in p_nodes); pn_ptr.append(len(pn))
+            pe.extend(edge_index.get(e, -1) for e in p_edges); pe_ptr.append(len(pe))
+        sg = cls(names, node_ids, array("i", map(code, node_labels)),
+                 array("d", map(_ts, node_ts)) if node_ts is not None else array("d", [_NAN]) * len(node_ids),
+                 node_props, edge_ids, array("i", map(code, edge_types)),
+                 array("i", map(endpoint, edge_src)), array("i", map(endpoint, edge_dst)),
+                 array("d", map(_ts, edge_ts)) if edge_ts is not None else array("d", [_NAN]) * len(edge_ids),
+                 edge_props, external, pn_ptr, pn, pe_ptr, pe, dict(meta or {}))
+        return sg  # the id -> index maps are rebuilt lazily if ever needed
+
+    @classmethod
+    def from_subgraph(cls, sg: Subgraph) -> "ColumnarSubgraph":
+        """Columnar copy of a Subgraph; props dicts are shared, not copied."""
+        nodes = list(sg.nodes.values()); edges = list(sg.edges.values())
+        return cls.from_columns(
+            list(sg.nodes), [n.label for n in nodes], [n.props for n in nodes], [n.ts for n in nodes],
+            list(sg.edges), [e.type for e in edges], [e.src for e in edges], [e.dst for e in edges],
+            [e.props for e in edges], [e.ts for e in edges],
+            [(p.node_ids, p.edge_ids) for p in sg.paths], sg.meta)
+
+    def to_subgraph(self) -> Subgraph:
+        return Subgraph(nodes=dict(self.nodes.items()), edges=dict(self.edges.items()), paths=self.paths, meta=dict(self.meta))
+
+    # --- access ---
+    @property
+    def node_index(self) -> Dict[Hashable, int]:
+        if self._node_index is None:
+            self._node_index = {nid: i for i, nid in enumerate(self.node_ids)}
+        return self._node_index
+
+    @property
+    def edge_index(self) -> Dict[str, int]:
+        if self._edge_index is None:
+            self._edge_index = {eid: i for i, eid in enumerate(self.edge_ids)}
+        return self._edge_index
+
+    @property
+    def nodes(self) -> Mapping:
+        return _NodeView(self)
+
+    @property
+    def edges(self) -> Mapping:
+        return _EdgeView(self)
+
+    @property
+    def paths(self) -> List[GraphPath]:
+        ids, eids = self.node_ids, self.edge_ids
+        return [GraphPath(node_ids=[ids[i] for i in self.path_nodes[a:b]], edge_ids=[eids[i] for i in self.path_edges[c:d]])
+                for a, b, c, d in zip(self.path_node_ptr, self.path_node_ptr[1:], self.path_edge_ptr, self.path_edge_ptr[1:])]
+
+    def node_id_at(self, i: int) -> Hashable:
+        """Node id for an endpoint index (negative: outside the subgraph)."""
+        return self.node_ids[i] if i >= 0 else self.external_ids[-i - 1]
+
+    def node(self, i: int) -> GraphNode:
+        return GraphNode(id=self.node_ids[i], label=self.names[self.node_label[i]], props=self.node_props[i],
+                         ts=_ts_value(self.node_ts[i]))
+
+    def edge(self, i: int) -> GraphEdge:
+        return GraphEdge(id=self.edge_ids[i], type=self.names[self.edge_type[i]], src=self.node_id_at(self.edge_src[i]),
+                         dst=self.node_id_at(self.edge_dst[i]), props=self.edge_props[i], ts=_ts_value(self.edge_ts[i]))
+
+    def iter_nodes(self) -> Iterator[Tuple[Hashable, str, Dict[str, Any], Optional[float]]]:
+        """(id, label, props, ts) per node without building GraphNode objects."""
+        names, props = self.names, self.node_props
+        for i, nid in enumerate(self.node_ids):
+            yield nid, names[self.node_label[i]], props[i], _ts_value(self.node_ts[i])
+
+    def iter_edges(self) -> Iterator[Tuple[str, str, Hashable, Hashable, Dict[str, Any], Optional[float]]]:
+        """(id, type, src, dst, props, ts) per edge."""
+        names, props, at = self.names, self.edge_props, self.node_id_at
+        for i, eid in enumerate(self.edge_ids):
+            yield eid, names[self.edge_type[i]], at(self.edge_src[i]), at(self.edge_dst[i]), props[i], _ts_value(self.edge_ts[i])
+
+    # --- adjacency ---
+    @property
+    def csr(self) -> Tuple[array, array]:
+        """(indptr, adj_edges): out-edges of node i are adj_edges[indptr[i]:indptr[i+1]]."""
+        if self._csr is None:
+            n = len(self.node_ids)
+            counts = [0] * (n + 1)
+            for s in self.edge_src:
+                if s >= 0:
+                    counts[s + 1] += 1
+            for i in range(n):
+                counts[i + 1] += counts[i]
+            indptr = array("i", counts); fill = counts[:-1]
+            adj = array("i", [0]) * counts[-1]
+            for e, s in enumerate(self.edge_src):
+                if s >= 0:
+                    adj[fill[s]] = e; fill[s] += 1
+            self._csr = (indptr, adj)
+        return self._csr
+
+    def out_edges(self, i: int) -> array:
+        indptr, adj = self.csr
+        return adj[indptr[i]:indptr[i + 1]]
+
+    # --- pruning ---
+    def keep_masks(self, node_keep: Sequence[bool], edge_keep: Optional[Sequence[bool]] = None):
+        """
+        Final (node, edge, path) keep-masks: an edge also needs both endpoints
+        kept, a path needs every node and edge on it kept.
+        """
+        n, m = len(self.node_ids), len(self.edge_ids)
+        if np is not None:
+            nk = np.append(np.asarray(node_keep, dtype=bool), False)  # slot n: "not in the subgraph"
+            ek = np.ones(m, dtype=bool) if edge_keep is None else np.asarray(edge_keep, dtype=bool).copy()
+            if m:
+                src = np.frombuffer(self.edge_src, dtype=np.intc); dst = np.frombuffer(self.edge_dst, dtype=np.intc)
+                ek &= nk[np.where(src >= 0, src, n)] & nk[np.where(dst >= 0, dst, n)]
+            pk = self._path_ok(nk, self.path_node_ptr, self.path_nodes, n) & \
+                self._path_ok(np.append(ek, False), self.path_edge_ptr, self.path_edges, m)
+            return nk[:n], ek, pk
+        nk = [bool(x) for x in node_keep]
+        ek = [True] * m if edge_keep is None else [bool(x) for x in edge_keep]
+        for e in range(m):
+            s, d = self.edge_src[e], self.edge_dst[e]
+            ek[e] = ek[e] and s >= 0 and d >= 0 and nk[s] and nk[d]
+        pnp, pn, pep, pe = self.path_node_ptr, self.path_nodes, self.path_edge_ptr, self.path_edges
+        pk = [all(i >= 0 and nk[i] for i in pn[pnp[k]:pnp[k + 1]]) and all(i >= 0 and ek[i] for i in pe[pep[k]:pep[k + 1]])
+              for k in range(len(pnp) - 1)]
+        return nk, ek, pk
+
+    @staticmethod
+    def _path_ok(keep, ptr, members, missing):
+        # keep has an extra False slot at `missing` for -1 members; count misses per path via a prefix sum
+        idx = np.frombuffer(members, dtype=np.intc) if len(members) else np.zeros(0, dtype=np.intc)
+        miss = ~keep[np.where(idx >= 0, idx, missing)]
+        cum = np.concatenate(([0], np.cumsum(miss, dtype=np.int64)))
+        bounds = np.frombuffer(ptr, dtype=np.intc)
+        return (cum[bounds[1:]] - cum[bounds[:-1]]) == 0
+
+    def select(self, node_keep: Sequence[bool], edge_keep: Optional[Sequence[bool]] = None) -> "ColumnarSubgraph":
+        """New subgraph with the kept artifacts (see keep_masks); columns are sliced, props are not copied."""
+        nk, ek, pk = self.keep_masks(node_keep, edge_keep)
+        if np is not None:
+            nodes = np.flatnonzero(nk).tolist(); edges = np.flatnonzero(ek).tolist(); paths = np.flatnonzero(pk).tolist()
+        else:
+            nodes = [i for i, k in enumerate(nk) if k]; edges = [i for i, k in enumerate(ek) if k]
+            paths = [i for i, k in enumerate(pk) if k]
+        remap = [-1] * len(self.node_ids)
+        for new, old in enumerate(nodes):
+            remap[old] = new
+        eremap = [-1] * len(self.edge_ids)
+        for new, old in enumerate(edges):
+            eremap[old] = new
+        pn_ptr = array("i", [0]); pn = array("i"); pe_ptr = array("i", [0]); pe = array("i")
+        for k in paths:
+            pn.extend(remap[i] for i in self.path_nodes[self.path_node_ptr[k]:self.path_node_ptr[k + 1]]); pn_ptr.append(len(pn))
+            pe.extend(eremap[i] for i in self.path_edges[self.path_edge_ptr[k]:self.path_edge_ptr[k + 1]]); pe_ptr.append(len(pe))
+        src, dst = self.edge_src, self.edge_dst
+        return ColumnarSubgraph(
+            self.names, _take(self.node_ids, nodes), _take(self.node_label, nodes), _take(self.node_ts, nodes),
+            _take(self.node_props, nodes), _take(self.edge_ids, edges), _take(self.edge_type, edges),
+            array("i", [remap[src[e]] for e in edges]), array("i", [remap[dst[e]] for e in edges]),
+            _take(self.edge_ts, edges), _take(self.edge_props, edges), [],  # kept edges never leave the subgraph
+            pn_ptr, pn, pe_ptr, pe, dict(self.meta))
+
+    def __repr__(self) -> str:
+        return f"ColumnarSubgraph(nodes={len(self.node_ids)}, edges={len(self.edge_ids)}, paths={len(self.path_node_ptr) - 1})"
@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+"""Taint propagation for FirewallGraph.sanitize.
+
+A node the firewall denied (or that carries a high-severity finding) taints
+everything within ``hops`` edges of it: a poisoned document node taints the
+entities it asserts. ``propagate()`` runs one multi-source frontier sweep, so
+each node is expanded at most once and each edge is looked at at most twice
+(once per direction), i.e. O(V + E) whatever the number of sources or paths.
+
+Config (``FirewallGraph(taint={...})``):
+  hops       k, how far taint spreads (default 1)
+  mode       "score": multiply tainted artifacts' score by ``factor``;
+             "quarantine": drop tainted artifacts (default "score")
+  factor     score multiplier for tainted artifacts (default 0.5)
+  min_score  in score mode, drop tainted artifacts whose score falls below it
+  sources    which nodes spread taint: "deny" and/or "high" (default both)
+  direction  "out" follows edges src -> dst, "both" ignores direction (default "out")
+"""
+from __future__ import annotations
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+TAINT_MODES = ("score", "quarantine")
+_DEFAULTS = {"hops": 1, "mode": "score", "factor": 0.5, "min_score": None, "sources": ("deny", "high"), "direction": "out"}
+
+
+def taint_config(cfg: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Validate a taint section and fill in defaults; None/{} disables taint."""
+    if not cfg:
+        return None
+    unknown = set(cfg) - set(_DEFAULTS)
+    if unknown:
+        raise ValueError(f"unknown taint option(s) {sorted(unknown)}; expected {sorted(_DEFAULTS)}")
+    out = dict(_DEFAULTS, **cfg)
+    if out["mode"] not in TAINT_MODES:
+        raise ValueError(f"unknown taint mode {out['mode']!r}; expected one of {TAINT_MODES}")
+    if out["direction"] not in ("out", "both"):
+        raise ValueError(f"unknown taint direction {out['direction']!r}; expected 'out' or 'both'")
+    sources = (out["sources"],) if isinstance(out["sources"], str) else tuple(out["sources"])
+    if set(sources) - {"deny", "high"}:
+        raise ValueError(f"taint sources must be 'deny' and/or 'high', got {sources!r}")
+    out["sources"] = sources
+    out["hops"] = max(0, int(out["hops"])); out["factor"] = float(out["factor"])
+    return out
+
+
+def is_source(r: Dict[str, Any], sources: Tuple[str, ...]) -> bool:
+    """Whether a verdict (the `_ragfw` dict) makes its node a taint source."""
+    if "deny" in sources and r.get("decision") == "deny":
+        return True
+    return "high" in sources and any(f.get("severity") == "high" for f in r.get("findings", ()))
+
+
+def propagate(sources: Iterable[Hashable], edges: Iterable[Tuple[Hashable, Hashable, Hashable]], hops: int,
+              direction: str = "out") -> Tuple[Dict[Hashable, Tuple[int, Hashable]], Dict[Hashable, Tuple[int, Hashable]]]:
+    """
+    Multi-source BFS from `sources` over (edge_id, src, dst) triples, up to
+    `hops` edges. Returns ({node: (hop, source)}, {edge: (hop, source)}) for
+    tainted nodes/edges; sources themselves are not included, and each
+    artifact keeps the nearest source (first seen, in source order, on ties).
+    """
+    origin: Dict[Hashable, Hashable] = {}
+    for s in sources:
+        origin.setdefault(s, s)
+    if hops <= 0 or not origin:
+        return {}, {}
+    adj: Dict[Hashable, list] = {}
+    for eid, src, dst in edges:
+        adj.setdefault(src, []).append((eid, dst))
+        if direction == "both" and dst != src:
+            adj.setdefault(dst, []).append((eid, src))
+    nodes: Dict[Hashable, Tuple[int, Hashable]] = {}
+    tainted_edges: Dict[Hashable, Tuple[int, Hashable]] = {}
+    frontier = list(origin)
+    for hop in range(1, hops + 1):
+        nxt = []
+        for u in frontier:
+            src = origin[u]
+            for eid, v in adj.get(u, ()):
+                if eid not in tainted_edges:
+                    tainted_edges[eid] = (hop, src)
+                if v not in origin:
+                    origin[v] = src; nodes[v] = (hop, src)
+                    nxt.append(v)
+        if not nxt:
+            break
+        frontier = nxt
+    return nodes, tainted_edges
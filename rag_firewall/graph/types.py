@@ -2,17 +2,22 @@
 # Copyright (c) 2025 Tal Adari
 
 from __future__ import annotations
+import sys
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
-@dataclass
+# no per-instance __dict__ where dataclasses support it (3.10+); large subgraphs hold
+# one object per artifact. See rag_firewall.graph.columnar for the compact layout.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class GraphNode:
     id: str
     label: str
     props: Dict[str, Any] = field(default_factory=dict)
     ts: Optional[float] = None  # optional timestamp for staleness/conflict
 
-@dataclass
+@dataclass(**_SLOTS)
 class GraphEdge:
     id: str
     type: str
@@ -21,12 +26,12 @@ class GraphEdge:
     props: Dict[str, Any] = field(default_factory=dict)
     ts: Optional[float] = None
 
-@dataclass
+@dataclass(**_SLOTS)
 class GraphPath:
     node_ids: List[str]
     edge_ids: List[str]
 
-@dataclass
+@dataclass(**_SLOTS)
 class Subgraph:
     nodes: Dict[str, GraphNode] = field(default_factory=dict)
     edges: Dict[str, GraphEdge] = field(default_factory=dict)
@@ -5,9 +5,12 @@ from __future__ import annotations
 from typing import Any, Dict, Iterable, List, Tuple
 import time
 
-from rag_firewall.audit import Audit, AuditEvent
+from rag_firewall.audit import Audit
+from rag_firewall.firewall import Firewall
 from rag_firewall.provenance.hasher import Hasher
 from rag_firewall.graph.types import Subgraph, GraphNode, GraphEdge, GraphPath
+from rag_firewall.graph.columnar import ColumnarSubgraph
+from rag_firewall.graph.taint import is_source, propagate, taint_config
 
 
 def _join_text_fields(props: Dict[str, Any], include_keys: Iterable[str] | None = None) -> str:
@@ -23,104 +26,237 @@ class GraphTextSerializer:
     """Default serializer: flatten a subgraph into LLM-ready text docs."""
     def __call__(self, sg: Subgraph) -> List[Dict[str, Any]]:
         docs: List[Dict[str, Any]] = []
-        for n in sg.nodes.values():
+        taint = sg.meta.get("taint") or {}
+        node_taint = taint.get("nodes") or {}; edge_taint = taint.get("edges") or {}
+        for nid, n in sg.nodes.items():
             text = _join_text_fields(n.props)
             meta = dict(n.props)
             meta.update({"_type": "node", "_id": n.id, "_label": n.label})
+            if nid in node_taint:
+                meta["_taint"] = node_taint[nid]
             docs.append({"page_content": f"[{n.label}#{n.id}]\n{text}", "metadata": meta})
-        for e in sg.edges.values():
+        for eid, e in sg.edges.items():
             text = _join_text_fields(e.props)
             meta = dict(e.props)
             meta.update({"_type": "edge", "_id": e.id, "_label": e.type, "_src": e.src, "_dst": e.dst})
+            if eid in edge_taint:
+                meta["_taint"] = edge_taint[eid]
             docs.append({"page_content": f"({e.type}:{e.src}->{e.dst})\n{text}", "metadata": meta})
         return docs
 
 
+def _content_key(props: Dict[str, Any]):
+    # equality-compared, so it cannot collide; unhashable values fall back to repr
+    key = tuple(props.items())
+    try:
+        hash(key)
+    except TypeError:
+        return repr(key)
+    return key
+
+
+class _ArtifactMeta(dict):
+    """
+    Scan-time metadata for one artifact without copying its props: the
+    artifact's own keys (label, timestamp, hash, ...) and whatever the firewall
+    sets live in this dict, other lookups fall through to the props, which are
+    never mutated. Pickles (process pools) and iterates as the merged dict.
+    """
+    __slots__ = ("props",)
+
+    def __init__(self, props: Dict[str, Any], own: Dict[str, Any]):
+        dict.__init__(self, own)
+        self.props = props
+
+    def __missing__(self, key):
+        return self.props[key]
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.props
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        return self.props.get(key, default)
+
+    def merged(self) -> Dict[str, Any]:
+        out = dict(self.props)
+        out.update(dict.items(self))
+        return out
+
+    def keys(self): return self.merged().keys()
+    def values(self): return self.merged().values()
+    def items(self): return self.merged().items()
+    def __iter__(self): return iter(self.merged())
+    def __len__(self): return len(self.merged())
+    def __bool__(self): return dict.__len__(self) > 0 or bool(self.props)  # `meta or {}` is on the hot path
+    def copy(self): return self.merged()
+    def __reduce__(self): return (dict, (self.merged(),))
+
+
 class FirewallGraph:
     """
     Runs your existing scanners/policies on node/edge text before prompt assembly.
     - Produces a sanitized Subgraph (possibly pruned).
     - Optionally serializes to text docs for LangChain/LlamaIndex.
+    - With a verdict_cache (e.g. rag_firewall.cache.LRUCache), verdicts are kept
+      per artifact, keyed by (id, label/type, timestamp, schema text fields,
+      props), so overlapping subgraphs only evaluate new or changed artifacts.
+      Clear it after changing the firewall's scanners or policies.
+    - With taint={...} (see rag_firewall.graph.taint), denied or high-finding
+      nodes taint what lies within k hops of them: tainted artifacts get a
+      lower score (listed in meta["taint"] and the docs' "_taint") or are
+      quarantined, i.e. dropped.
     """
-    def __init__(self, firewall, schema: Dict[str, Any] | None = None, serializer=None):
+    def __init__(self, firewall, schema: Dict[str, Any] | None = None, serializer=None, verdict_cache=None,
+                 taint: Dict[str, Any] | None = None):
         self.firewall = firewall
         self.schema = schema or {}
         self.serializer = serializer or GraphTextSerializer()
+        self.verdict_cache = verdict_cache
+        self.taint = taint_config(taint)
 
-    def sanitize(self, sg: Subgraph) -> Subgraph:
-        # --- Build a single batch of docs for all artifacts (nodes + edges) ---
+    def sanitize(self, sg: Subgraph | ColumnarSubgraph) -> Subgraph | ColumnarSubgraph:
+        """Pruned copy of sg, of the same type (a ColumnarSubgraph is pruned with keep-masks)."""
+        # --- Build a single batch of docs for the artifacts (nodes + edges) without a cached verdict ---
         if not hasattr(self.firewall, "evaluate"):
             raise AttributeError("FirewallGraph requires firewall.evaluate(docs) to be available")
 
+        cache = self.verdict_cache
+        verdicts: Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]] = {}  # (kind, id) -> (chunk hash, _ragfw)
         batch: List[Dict[str, Any]] = []
-        idx_to_art: List[Tuple[str, str]] = []  # (kind, id) -> ("node", nid) or ("edge", eid)
+        pending: List[Tuple[Tuple[str, str], Any]] = []  # ((kind, id), cache key) per batch entry
+
+        columnar = isinstance(sg, ColumnarSubgraph)
+        if columnar:
+            node_rows, edge_rows = sg.iter_nodes(), sg.iter_edges()
+        else:
+            node_rows = ((nid, n.label, n.props, n.ts) for nid, n in sg.nodes.items())
+            edge_rows = ((eid, e.type, e.src, e.dst, e.props, e.ts) for eid, e in sg.edges.items())
+        node_ids: List[Any] = []; edge_ids: List[Any] = []
+        taint = self.taint
+        triples: List[Tuple[Any, Any, Any]] = []  # (edge id, src, dst) for the taint sweep
 
         # Nodes
-        for nid, n in sg.nodes.items():
-            text = _join_text_fields(n.props, self._text_fields_for_label(n.label))
-            meta = dict(n.props)
-            meta.update({
-                "label": n.label,
-                "timestamp": n.ts,
+        for nid, label, props, ts in node_rows:
+            node_ids.append(nid)
+            fields = self._text_fields_for_label(label)
+            key = None
+            if cache is not None:
+                key = ("node", nid, label, ts, tuple(fields) if fields else None, _content_key(props))
+                hit = cache.get(key)
+                if hit is not None:
+                    verdicts[("node", nid)] = hit
+                    continue
+            text = _join_text_fields(props, fields)
+            meta = _ArtifactMeta(props, {
+                "label": label,
+                "timestamp": ts,
                 "_artifact_kind": "node",
                 "_artifact_id": nid,
+                "hash": Hasher.hash_text((nid or "") + (text or "")),
             })
-            meta["hash"] = Hasher.hash_text((nid or "") + (text or ""))
             batch.append({"page_content": text, "metadata": meta})
-            idx_to_art.append(("node", nid))
+            pending.append((("node", nid), key))
 
         # Edges
-        for eid, e in sg.edges.items():
-            text = _join_text_fields(e.props, self._text_fields_for_edge(e.type))
-            meta = dict(e.props)
-            meta.update({
-                "edge_type": e.type,
-                "src": e.src,
-                "dst": e.dst,
-                "timestamp": e.ts,
+        for eid, etype, src, dst, props, ts in edge_rows:
+            edge_ids.append(eid)
+            if taint is not None:
+                triples.append((eid, src, dst))
+            fields = self._text_fields_for_edge(etype)
+            key = None
+            if cache is not None:
+                key = ("edge", eid, etype, src, dst, ts, tuple(fields) if fields else None, _content_key(props))
+                hit = cache.get(key)
+                if hit is not None:
+                    verdicts[("edge", eid)] = hit
+                    continue
+            text = _join_text_fields(props, fields)
+            meta = _ArtifactMeta(props, {
+                "edge_type": etype,
+                "src": src,
+                "dst": dst,
+                "timestamp": ts,
                 "_artifact_kind": "edge",
                 "_artifact_id": eid,
+                "hash": Hasher.hash_text((eid or "") + (text or "")),
             })
-            meta["hash"] = Hasher.hash_text((eid or "") + (text or ""))
             batch.append({"page_content": text, "metadata": meta})
-            idx_to_art.append(("edge", eid))
+            pending.append((("edge", eid), key))
 
         # --- Evaluate via the real firewall pipeline (scanners + policies) ---
-        out_docs = self.firewall.evaluate(batch) or []
+        # the subgraph is audited below as one event; skip the firewall's per-doc events
+        quiet = isinstance(self.firewall, Firewall)
+        out_docs = ((self.firewall.evaluate(batch, audit=False) if quiet else self.firewall.evaluate(batch)) if batch else []) or []
+        for (art, key), out in zip(pending, out_docs):
+            meta = (out or {}).get("metadata", {}) or {}
+            verdict = (meta.get("hash"), meta.get("_ragfw", {}) or {})
+            verdicts[art] = verdict
+            if key is not None:
+                cache.set(key, verdict)
 
-        # --- Decide/prune using actual decisions; audit consistently ---
-        keep_nodes: Dict[str, GraphNode] = {}
-        keep_edges: Dict[str, GraphEdge] = {}
+        # --- Taint: one frontier sweep from denied/high-finding nodes ---
+        tainted: Dict[str, Dict[Any, Tuple[int, Any]]] = {"node": {}, "edge": {}}
+        if taint is not None:
+            sources = [nid for nid in node_ids
+                       if ("node", nid) in verdicts and is_source(verdicts[("node", nid)][1], taint["sources"])]
+            tainted["node"], tainted["edge"] = propagate(sources, triples, taint["hops"], taint["direction"])
+        taint_meta: Dict[str, Dict[Any, Dict[str, Any]]] = {"nodes": {}, "edges": {}}
 
-        for i, out in enumerate(out_docs):
-            kind, art_id = idx_to_art[i]
-            meta = (out or {}).get("metadata", {}) or {}
-            r = meta.get("_ragfw", {}) or {}
-
-            Audit.log(AuditEvent(
-                ts=time.time(),
-                chunk_hash=meta.get("hash"),
-                decision=r.get("decision", "allow"),
-                score=float(r.get("score", 1.0)),
-                reasons=r.get("reasons", []),
-                findings=r.get("findings", []),
-                policy=r.get("policy"),
-            ))
-
-            # Only drop artifacts that your policy engine decided to deny
-            if r.get("decision") == "deny":
-                continue
-
-            if kind == "node":
-                n = sg.nodes.get(art_id)
-                if n is not None:
-                    keep_nodes[art_id] = n
-            else:
-                e = sg.edges.get(art_id)
-                if e is not None:
-                    # keep edge only if endpoints survived
-                    if e.src in keep_nodes and e.dst in keep_nodes:
-                        keep_edges[art_id] = e
+        # --- Decide/prune using actual decisions ---
+        rows: List[Dict[str, Any]] = []
+
+        def allowed(kind: str, art_id: Any) -> bool:
+            verdict = verdicts.get((kind, art_id))
+            if verdict is None:
+                return False
+            chunk_hash, r = verdict
+            decision = r.get("decision", "allow")
+            score = float(r.get("score", 1.0))
+            reasons = r.get("reasons", [])
+            hit = tainted[kind].get(art_id)
+            if hit is not None and decision != "deny":
+                hop, source = hit
+                score *= taint["factor"]
+                reasons = list(reasons) + [f"taint:{source}@{hop}"]
+                if taint["mode"] == "quarantine" or (taint["min_score"] is not None and score < taint["min_score"]):
+                    decision = "quarantine"
+                else:
+                    taint_meta[kind + "s"][art_id] = {"source": source, "hops": hop, "score": score}
+            rows.append({
+                "kind": kind,
+                "id": art_id,
+                "chunk_hash": chunk_hash,
+                "decision": decision,
+                "score": score,
+                "reasons": reasons,
+                "findings": r.get("findings", []),
+                "policy": r.get("policy"),
+            })
+            # Drop artifacts that your policy engine denied (and quarantined taint)
+            return decision not in ("deny", "quarantine")
+
+        node_keep = [allowed("node", nid) for nid in node_ids]
+        edge_keep = [allowed("edge", eid) for eid in edge_ids]
+        self._audit(rows)
+
+        if columnar:
+            # edge endpoints and paths are pruned with vectorized keep-masks
+            out = sg.select(node_keep, edge_keep)
+            if taint is not None:
+                kept = set(out.edge_ids)  # tainted edges may still lose an endpoint
+                taint_meta["edges"] = {k: v for k, v in taint_meta["edges"].items() if k in kept}
+                out.meta["taint"] = taint_meta
+            return out
+
+        keep_nodes: Dict[str, GraphNode] = {nid: sg.nodes[nid] for nid, ok in zip(node_ids, node_keep) if ok}
+        keep_edges: Dict[str, GraphEdge] = {}
+        for eid, ok in zip(edge_ids, edge_keep):
+            e = sg.edges[eid]
+            # keep edge only if endpoints survived
+            if ok and e.src in keep_nodes and e.dst in keep_nodes:
+                keep_edges[eid] = e
 
         # --- Prune paths accordingly ---
         keep_paths: List[GraphPath] = []
@@ -128,12 +264,41 @@ class FirewallGraph:
             if all(nid in keep_nodes for nid in p.node_ids) and all(eid in keep_edges for eid in p.edge_ids):
                 keep_paths.append(p)
 
-        return Subgraph(nodes=keep_nodes, edges=keep_edges, paths=keep_paths, meta=dict(sg.meta))
+        meta = dict(sg.meta)
+        if taint is not None:
+            taint_meta["edges"] = {k: v for k, v in taint_meta["edges"].items() if k in keep_edges}
+            meta["taint"] = taint_meta
+        return Subgraph(nodes=keep_nodes, edges=keep_edges, paths=keep_paths, meta=meta)
 
     def to_documents(self, sanitized: Subgraph) -> List[Dict[str, Any]]:
         return self.serializer(sanitized)
 
     # --- helpers ---
+    @staticmethod
+    def _audit(rows: List[Dict[str, Any]]) -> None:
+        """
+        One event per sanitize call, carrying a row per artifact. Audit.query
+        and AuditIndex also find the event by any artifact row's chunk_hash.
+        """
+        if not rows:
+            return
+        denied = sum(1 for r in rows if r["decision"] == "deny")
+        quarantined = sum(1 for r in rows if r["decision"] == "quarantine")
+        reasons = [f"graph:{denied}/{len(rows)} denied"]
+        if quarantined:
+            reasons.append(f"graph:{quarantined}/{len(rows)} quarantined")
+        Audit.log({
+            "ts": time.time(),
+            "chunk_hash": Hasher.hash_text("\n".join(sorted(str(r["chunk_hash"]) for r in rows))),
+            "decision": "deny" if denied else ("quarantine" if quarantined else "allow"),
+            "score": min(r["score"] for r in rows),
+            "reasons": reasons,
+            "findings": [],
+            "policy": None,
+            "event": "graph_sanitize",
+            "artifacts": rows,
+        })
+
     def _text_fields_for_label(self, label: str) -> List[str] | None:
         return (self.schema.get("text_fields") or {}).get(label)
 
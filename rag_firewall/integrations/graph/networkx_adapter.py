@@ -2,57 +2,188 @@
 # Copyright (c) 2025 Tal Adari
 
 from __future__ import annotations
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Hashable, List, Optional
 import networkx as nx
 from rag_firewall.graph.types import GraphNode, GraphEdge, GraphPath, Subgraph
+from rag_firewall.graph.columnar import ColumnarSubgraph, LazyProps
 from .base import GraphRetrieverAdapter
 
+_MISSING = object()
+
+
 class NetworkXAdapter(GraphRetrieverAdapter):
     """
     Tiny demo adapter.
     - Expects an nx.MultiDiGraph (or DiGraph).
     - `query` can be any key you decide; here we treat it as a simple
       label filter like "Meeting" or "Decision" and return neighborhood.
+    - Seeds come from a label -> nodes index built once. Nodes added, removed
+      or relabelled through add_node()/remove_node()/index_node() keep it
+      current; if the node count changes behind its back it is rebuilt.
+      A label set directly on G (G.nodes[n]["label"] = ...) is not seen until
+      index_node(n) or rebuild_index() is called: the node is never returned
+      as a seed for its new label (nodes leaving a label are filtered out).
     """
     def __init__(self, graph: nx.MultiDiGraph | nx.DiGraph):
         self.G = graph
+        self.rebuild_index()
+
+    # --- label index ---
+    def rebuild_index(self) -> None:
+        by_label: Dict[Any, Dict[Hashable, None]] = {}  # dicts as insertion-ordered sets
+        labels: Dict[Hashable, Any] = {}
+        for n, label in self.G.nodes(data="label"):
+            by_label.setdefault(label, {})[n] = None
+            labels[n] = label
+        self._by_label = by_label; self._labels = labels
+        self._indexed = len(self.G)
+
+    def index_node(self, n: Hashable) -> None:
+        """Re-index one node after adding, removing or relabelling it in self.G."""
+        old = self._labels.pop(n, _MISSING)
+        if old is not _MISSING:
+            members = self._by_label.get(old)
+            if members is not None:
+                members.pop(n, None)
+                if not members:
+                    del self._by_label[old]
+        if n in self.G:
+            label = self.G.nodes[n].get("label")
+            self._by_label.setdefault(label, {})[n] = None
+            self._labels[n] = label
+        self._indexed = len(self.G)
+
+    def add_node(self, n: Hashable, **attrs: Any) -> None:
+        self.G.add_node(n, **attrs)
+        self.index_node(n)
+
+    def remove_node(self, n: Hashable) -> None:
+        self.G.remove_node(n)
+        self.index_node(n)
+
+    def seeds(self, label: Any) -> List[Hashable]:
+        """Nodes whose label equals `label`, in index (graph insertion) order."""
+        if len(self.G) != self._indexed:
+            self.rebuild_index()
+        nodes = self.G.nodes
+        # cheap re-check drops nodes whose label was changed away in place; nodes
+        # relabelled *to* `label` directly on G need index_node()/rebuild_index()
+        return [n for n in self._by_label.get(label, ()) if n in nodes and nodes[n].get("label") == label]
+
+    # --- retrieval ---
+    def retrieve(self, query: str, radius: int = 1, max_nodes: Optional[int] = None,
+                 max_edges: Optional[int] = None, columnar: bool = False) -> Subgraph | ColumnarSubgraph:
+        """
+        All nodes with label==query and everything within `radius` hops along
+        out-edges, found by one multi-source BFS, plus the edges between them.
+        Nodes are collected nearest-first, so max_nodes/max_edges keep the
+        closest context; meta["truncated"] tells whether a cap was hit.
+        columnar=True returns a ColumnarSubgraph whose props are read from
+        the graph on access instead of being copied up front.
+        """
+        G = self.G
+        adj = G.adj
+        seeds = self.seeds(query)
+        truncated = False
+        if max_nodes is not None and len(seeds) > max_nodes:
+            seeds = seeds[:max(0, max_nodes)]; truncated = True
+
+        # node -> hop count; insertion order is BFS order
+        depth: Dict[Hashable, int] = dict.fromkeys(seeds, 0)
+        frontier = list(depth)
+        hop = 0
+        while frontier and hop < radius and not truncated:
+            hop += 1
+            nxt = []
+            for u in frontier:
+                for v in adj[u]:
+                    if v in depth:
+                        continue
+                    if max_nodes is not None and len(depth) >= max_nodes:
+                        truncated = True
+                        break
+                    depth[v] = hop
+                    nxt.append(v)
+                if truncated:
+                    break
+            frontier = nxt
+
+        if columnar:
+            return self._columnar(query, radius, seeds, depth, max_edges, truncated, max_nodes is not None or max_edges is not None)
 
-    def retrieve(self, query: str, radius: int = 1) -> Subgraph:
-        # Example: return all nodes with label==query and their r-hop neighborhood
         nodes: Dict[str, GraphNode] = {}
+        for n in depth:
+            d = G.nodes[n]
+            nodes[n] = GraphNode(
+                id=str(n),
+                label=str(d.get("label", "Unknown")),
+                props={k: v for k, v in d.items() if k not in ("label",)},
+                ts=d.get("ts"),
+            )
+
         edges: Dict[str, GraphEdge] = {}
-        paths: list[GraphPath] = []
-
-        # collect seed nodes
-        seeds = [n for n, d in self.G.nodes(data=True) if d.get("label") == query]
-        seen: set[str] = set()
-        for s in seeds:
-            # r-hop ego subgraph
-            ego = nx.ego_graph(self.G, s, radius=radius, undirected=False)
-            for n, d in ego.nodes(data=True):
-                if n not in nodes:
-                    nodes[n] = GraphNode(
-                        id=str(n),
-                        label=str(d.get("label", "Unknown")),
-                        props={k: v for k, v in d.items() if k not in ("label",)},
-                        ts=d.get("ts"),
-                    )
-            for u, v, k, d in ego.edges(keys=True, data=True) if isinstance(self.G, nx.MultiDiGraph) \
-                    else [(u, v, None, d) for u, v, d in ego.edges(data=True)]:
-                eid = f"{u}->{v}#{k}" if k is not None else f"{u}->{v}"
-                if eid not in edges:
-                    edges[eid] = GraphEdge(
-                        id=eid,
-                        type=str(d.get("type", "edge")),
-                        src=str(u),
-                        dst=str(v),
-                        props={k2: v2 for k2, v2 in d.items() if k2 not in ("type",)},
-                        ts=d.get("ts"),
-                    )
-            seen.update(ego.nodes())
+        for u, v, k, d in self._edges_within(depth):
+            if max_edges is not None and len(edges) >= max_edges:
+                truncated = True
+                break
+            eid = f"{u}->{v}#{k}" if k is not None else f"{u}->{v}"
+            edges[eid] = GraphEdge(
+                id=eid,
+                type=str(d.get("type", "edge")),
+                src=str(u),
+                dst=str(v),
+                props={k2: v2 for k2, v2 in d.items() if k2 not in ("type",)},
+                ts=d.get("ts"),
+            )
 
         # optional naïve paths (node-only)
-        for n in seeds:
-            paths.append(GraphPath(node_ids=[n], edge_ids=[]))
+        paths = [GraphPath(node_ids=[n], edge_ids=[]) for n in seeds]
+
+        meta: Dict[str, Any] = {"query": query, "radius": radius}
+        if max_nodes is not None or max_edges is not None:
+            meta["truncated"] = truncated
+        return Subgraph(nodes=nodes, edges=edges, paths=paths, meta=meta)
+
+    def _columnar(self, query, radius, seeds, depth, max_edges, truncated, capped) -> ColumnarSubgraph:
+        G = self.G
+        node_data = G.nodes
+        edge_keys: List[tuple] = []; edge_ids: List[str] = []; edge_types: List[str] = []; edge_ts: List[Any] = []
+        for u, v, k, d in self._edges_within(depth):
+            if max_edges is not None and len(edge_ids) >= max_edges:
+                truncated = True
+                break
+            edge_keys.append((u, v, k))
+            edge_ids.append(f"{u}->{v}#{k}" if k is not None else f"{u}->{v}")
+            edge_types.append(str(d.get("type", "edge"))); edge_ts.append(d.get("ts"))
+        adj = G.adj; multi = G.is_multigraph()
+        def node_props(n):
+            return {k: v for k, v in node_data[n].items() if k not in ("label",)}
+        def edge_props(key):
+            u, v, k = key
+            d = adj[u][v][k] if multi else adj[u][v]
+            return {k2: v2 for k2, v2 in d.items() if k2 not in ("type",)}
+        meta: Dict[str, Any] = {"query": query, "radius": radius}
+        if capped:
+            meta["truncated"] = truncated
+        return ColumnarSubgraph.from_columns(
+            list(depth), [str(node_data[n].get("label", "Unknown")) for n in depth], LazyProps(list(depth), node_props),
+            [node_data[n].get("ts") for n in depth],
+            edge_ids, edge_types, [str(u) for u, _, _ in edge_keys], [str(v) for _, v, _ in edge_keys],
+            LazyProps(edge_keys, edge_props), edge_ts,
+            [([n], []) for n in seeds], meta)
 
-        return Subgraph(nodes=nodes, edges=edges, paths=paths, meta={"query": query, "radius": radius})
\ No newline at end of file
+    def _edges_within(self, nodes: Dict[Hashable, int]):
+        """(u, v, key, data) for every edge with both endpoints in `nodes`, in BFS order of u."""
+        adj = self.G.adj
+        multi = self.G.is_multigraph(); directed = self.G.is_directed()
+        done: set = set()  # undirected: each edge is reported from its first endpoint only
+        for u in nodes:
+            for v, data in adj[u].items():
+                if v not in nodes or (not directed and v in done):
+                    continue
+                if multi:
+                    for k, d in data.items():
+                        yield u, v, k, d
+                else:
+                    yield u, v, None, data
+            done.add(u)
@@ -11,9 +11,11 @@ Usage:
 
     fw = Firewall.from_yaml("firewall.yaml")
     safe_retriever = FirewallRetriever(base_retriever, firewall=fw, provenance_store=prov)
+    docs = await safe_retriever.aget_relevant_documents("query")  # asyncio stacks
 
 You must install langchain separately.
 """
+import asyncio
 from typing import Any, List, Optional
 
 try:
@@ -26,6 +28,7 @@ except Exception:  # pragma: no cover
             raise NotImplementedError
 
 from ..firewall import Firewall
+from ..provenance.resolver import as_resolver
 
 class FirewallRetriever(BaseRetriever):
     """Wraps any BaseRetriever and applies RAG Firewall decisions."""
@@ -33,15 +36,45 @@ class FirewallRetriever(BaseRetriever):
         self.base = base
         self.firewall = firewall
         self.provenance = provenance_store
+        self._resolver = as_resolver(provenance_store)
 
-    def _get_relevant_documents(self, query: str) -> List[Document]:
+    def _get_relevant_documents(self, query: str, **kwargs: Any) -> List[Document]:
         # LC v0.2+ uses _get_relevant_documents
         docs = self.base.get_relevant_documents(query) if hasattr(self.base, "get_relevant_documents") else self.base._get_relevant_documents(query)
+        payloads = self._payloads(docs)
+        if self._resolver is not None:
+            # one batched provenance lookup for the whole result set
+            self._resolver.enrich(payloads)
+        decisions = self.firewall.decide_many(payloads, base_score=1.0, context={"query": query})
+        return self._assemble(docs, payloads, decisions)
+
+    async def _aget_relevant_documents(self, query: str, **kwargs: Any) -> List[Document]:
+        """Async variant: base retrieval, provenance and scanning never block the event loop."""
+        docs = await self._abase_documents(query)
+        payloads = self._payloads(docs)
+        if self._resolver is not None:
+            await self._resolver.aenrich(payloads)
+        decisions = await self.firewall.adecide_many(payloads, base_score=1.0, context={"query": query})
+        return self._assemble(docs, payloads, decisions)
+
+    async def _abase_documents(self, query: str) -> List[Any]:
+        for name in ("ainvoke", "aget_relevant_documents"):
+            fn = getattr(self.base, name, None)
+            if fn is not None:
+                return await fn(query)
+        loop = asyncio.get_running_loop()
+        sync = self.base.get_relevant_documents if hasattr(self.base, "get_relevant_documents") else self.base._get_relevant_documents
+        return await loop.run_in_executor(None, sync, query)
+
+    @staticmethod
+    def _payloads(docs) -> List[dict]:
+        # LangChain Document has .page_content/.metadata
+        return [{"page_content": getattr(d, "page_content", None), "metadata": getattr(d, "metadata", None) or {}} for d in docs]
+
+    @staticmethod
+    def _assemble(docs, payloads, decisions) -> List[Document]:
         safe_docs = []
-        for d in docs:
-            # LangChain Document has .page_content/.metadata
-            payload = {"page_content": getattr(d, "page_content", None), "metadata": getattr(d, "metadata", {})}
-            dec, findings = self.firewall.decide(payload, base_score=1.0, context={"query": query})
+        for d, payload, (dec, findings) in zip(docs, payloads, decisions):
             if dec.get("action") == "deny":
                 continue
             md = payload["metadata"]
@@ -64,3 +97,6 @@ class FirewallRetriever(BaseRetriever):
     # Back-compat for LC that calls get_relevant_documents
     def get_relevant_documents(self, query: str) -> List[Document]:
         return self._get_relevant_documents(query)
+
+    async def aget_relevant_documents(self, query: str) -> List[Document]:
+        return await self._aget_relevant_documents(query)
@@ -9,7 +9,9 @@ Usage:
 
     safe = TrustyRetriever(base_retriever, firewall=fw, provenance_store=prov)
     nodes = safe.retrieve("query")
+    nodes = await safe.aretrieve("query")  # asyncio stacks
 """
+import asyncio
 from typing import Any, List, Optional
 
 try:
@@ -21,17 +23,43 @@ except Exception:  # pragma: no cover
     class NodeWithScore: pass
 
 from ..firewall import Firewall
+from ..provenance.resolver import as_resolver
 
 class TrustyRetriever(LIBaseRetriever):
     def __init__(self, base: LIBaseRetriever, firewall: Firewall, provenance_store: Optional[Any]=None):
         self.base = base
         self.firewall = firewall
         self.provenance = provenance_store
+        self._resolver = as_resolver(provenance_store)
 
     def retrieve(self, query: str) -> List[NodeWithScore]:
         results = self.base.retrieve(query)
-        safe = []
-        enriched = []
+        payloads = self._payloads(results)
+        if self._resolver is not None:
+            # one batched provenance lookup for the whole result set
+            self._resolver.enrich(payloads)
+        decisions = self.firewall.decide_many(payloads, base_score=self._base_scores(results), context={"query": query})
+        return self._assemble(results, payloads, decisions)
+
+    async def aretrieve(self, query: str) -> List[NodeWithScore]:
+        """Async variant: base retrieval, provenance and scanning never block the event loop."""
+        if hasattr(self.base, "aretrieve"):
+            results = await self.base.aretrieve(query)
+        else:
+            results = await asyncio.get_running_loop().run_in_executor(None, self.base.retrieve, query)
+        payloads = self._payloads(results)
+        if self._resolver is not None:
+            await self._resolver.aenrich(payloads)
+        decisions = await self.firewall.adecide_many(payloads, base_score=self._base_scores(results), context={"query": query})
+        return self._assemble(results, payloads, decisions)
+
+    @staticmethod
+    def _base_scores(results) -> List[float]:
+        return [getattr(r, "score", 1.0) or 1.0 for r in results]
+
+    @staticmethod
+    def _payloads(results) -> List[dict]:
+        payloads = []
         for r in results:
             # NodeWithScore has .node with .get_content(), .metadata
             node = getattr(r, "node", None)
@@ -43,8 +71,15 @@ class TrustyRetriever(LIBaseRetriever):
                 except Exception:
                     text = getattr(node, "text", None)
                 md = getattr(node, "metadata", {}) or {}
-            payload = {"page_content": text, "metadata": md}
-            dec, findings = self.firewall.decide(payload, base_score=getattr(r, "score", 1.0) or 1.0, context={"query": query})
+            payloads.append({"page_content": text, "metadata": md})
+        return payloads
+
+    @staticmethod
+    def _assemble(results, payloads, decisions) -> List[NodeWithScore]:
+        safe = []
+        for r, payload, (dec, findings) in zip(results, payloads, decisions):
+            node = getattr(r, "node", None)
+            md = payload["metadata"]
             if dec.get("action") == "deny":
                 continue
             md["_ragfw"] = {"decision": dec.get("action"), "score": dec.get("score", 1.0), "reasons": dec.get("reasons", []), "policy": dec.get("policy")}
@@ -0,0 +1,231 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+"""Optional hot-path metrics for the firewall.
+
+Pass ``Firewall(metrics=MetricsRegistry())`` (or ``metrics: {enabled: true}``
+in YAML) to record:
+
+  ragfw_scan_plan_seconds               shared pattern pass (histogram)
+  ragfw_scanner_seconds{scanner}        wall time per scanner (histogram)
+  ragfw_scanned_chars_total{scanner}    characters handed to each scanner
+  ragfw_scanner_findings_total{scanner} findings produced
+  ragfw_policy_seconds{policy}          matcher time per policy (histogram)
+  ragfw_decide_seconds                  scan + policies + audit per chunk
+  ragfw_decisions_total{action}
+  ragfw_cache_*                         findings-cache hits/misses/hit ratio (gauges)
+  ragfw_audit_queue_depth               async audit queue depth (gauge)
+
+Anything with ``observe``/``inc``/``gauge`` works as a backend; ``Metrics`` is
+the no-op base. With ``metrics=None`` (the default) the firewall skips all of
+this behind a single ``is None`` check per scanner/policy.
+
+With ``executor="process"`` each worker records into its own registry, which
+is drained after every chunk and merged into the firewall's (``drain()`` /
+``merge()``). A registry callback fires in the worker that made the observation.
+Other backends are not merged back from worker processes.
+"""
+from __future__ import annotations
+import bisect, math, threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+Labels = Tuple[Tuple[str, str], ...]
+# 1us .. ~16s in powers of two: fine enough for per-scanner timings
+DEFAULT_BUCKETS = tuple(1e-6 * 2 ** k for k in range(25))
+
+
+def _labels(labels: Union[Labels, Dict[str, str], None]) -> Labels:
+    if not labels:
+        return ()
+    if isinstance(labels, dict):
+        return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+    return labels
+
+
+class Histogram:
+    """Fixed-bucket histogram (upper bounds, Prometheus `le` semantics)."""
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0; self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value; self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf if in the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count; seen = 0
+        for bound, n in zip(self.buckets + (math.inf,), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "sum": self.sum, "buckets": dict(zip(self.buckets + (math.inf,), self.counts)),
+                "p50": self.quantile(0.5), "p99": self.quantile(0.99)}
+
+
+class Metrics:
+    """Metrics backend interface; every method is a no-op here."""
+    def observe(self, name: str, value: float, labels: Union[Labels, Dict[str, str], None] = None) -> None:
+        pass
+
+    def inc(self, name: str, value: float = 1.0, labels: Union[Labels, Dict[str, str], None] = None) -> None:
+        pass
+
+    def gauge(self, name: str, fn: Callable[[], float], labels: Union[Labels, Dict[str, str], None] = None) -> None:
+        """Register a value read at collection time (queue depths, cache stats)."""
+
+
+class MetricsRegistry(Metrics):
+    """
+    In-process registry: histograms, counters and pull gauges, exported with
+    snapshot() or prometheus(). An optional callback(kind, name, value, labels)
+    also receives every observation as it happens.
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, callback: Optional[Callable] = None):
+        self.default_buckets = tuple(buckets)
+        self.callback = callback
+        self._hist: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, labels=None):
+        key = (name, _labels(labels))
+        h = self._hist.get(key)
+        if h is None:
+            with self._lock:
+                h = self._hist.setdefault(key, Histogram(self.default_buckets))
+        h.observe(value)
+        if self.callback is not None:
+            self.callback("histogram", name, value, dict(key[1]))
+
+    def inc(self, name, value=1.0, labels=None):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+        if self.callback is not None:
+            self.callback("counter", name, value, dict(key[1]))
+
+    def gauge(self, name, fn, labels=None):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = fn
+
+    def _read_gauges(self) -> Dict[Tuple[str, Labels], float]:
+        out = {}
+        for key, fn in list(self._gauges.items()):
+            try:
+                out[key] = float(fn())
+            except Exception:
+                continue  # a failing gauge must not break the export
+        return out
+
+    def snapshot(self) -> dict:
+        """{"histograms"|"counters"|"gauges": {name: [{"labels": {...}, ...}]}}"""
+        out: dict = {"histograms": {}, "counters": {}, "gauges": {}}
+        for (name, labels), h in list(self._hist.items()):
+            out["histograms"].setdefault(name, []).append({"labels": dict(labels), **h.snapshot()})
+        for (name, labels), v in list(self._counters.items()):
+            out["counters"].setdefault(name, []).append({"labels": dict(labels), "value": v})
+        for (name, labels), v in self._read_gauges().items():
+            out["gauges"].setdefault(name, []).append({"labels": dict(labels), "value": v})
+        return out
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        def fmt(labels: Labels, extra: Labels = ()) -> str:
+            items = labels + extra
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+        by_name: Dict[str, list] = {}
+        for (name, labels), h in sorted(self._hist.items()):
+            by_name.setdefault(name, []).append((labels, h))
+        for name, series in by_name.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, h in series:
+                cum = 0
+                for bound, n in zip(h.buckets + (math.inf,), h.counts):
+                    cum += n
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', le),))} {cum}")
+                lines.append(f"{name}_sum{fmt(labels)} {h.sum!r}")
+                lines.append(f"{name}_count{fmt(labels)} {h.count}")
+        typed = set()
+        for (name, labels), v in sorted(self._counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter"); typed.add(name)
+            lines.append(f"{name}{fmt(labels)} {v!r}")
+        for (name, labels), v in sorted(self._read_gauges().items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} gauge"); typed.add(name)
+            lines.append(f"{name}{fmt(labels)} {v!r}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hist.clear(); self._counters.clear()
+
+    def drain(self) -> dict:
+        """Histogram and counter data recorded since the last drain (picklable); resets them."""
+        with self._lock:
+            hist, self._hist = self._hist, {}
+            counters, self._counters = self._counters, {}
+        return {"histograms": {k: (h.buckets, h.counts, h.sum, h.count) for k, h in hist.items()},
+                "counters": counters}
+
+    def merge(self, delta: dict) -> None:
+        """Add another registry's drain() output, e.g. from a process-pool worker."""
+        for key, (buckets, counts, total, count) in delta.get("histograms", {}).items():
+            with self._lock:
+                h = self._hist.setdefault(key, Histogram(buckets))
+            if h.buckets != tuple(buckets):
+                continue  # incompatible bucket layout; nothing sensible to add
+            with h._lock:
+                h.counts = [a + b for a, b in zip(h.counts, counts)]
+                h.sum += total; h.count += count
+        with self._lock:
+            for key, v in delta.get("counters", {}).items():
+                self._counters[key] = self._counters.get(key, 0.0) + v
+
+    def __getstate__(self):
+        # worker processes get an empty registry of their own (gauges close over local
+        # objects); the firewall drains it after every chunk and merges it here
+        return {"default_buckets": self.default_buckets, "callback": self.callback}
+
+    def __setstate__(self, state):
+        self.__init__(state["default_buckets"], state["callback"])
+
+
+class CallbackMetrics(Metrics):
+    """Forwards every observation to callback(kind, name, value, labels); keeps nothing."""
+    def __init__(self, callback: Callable):
+        self.callback = callback
+
+    def observe(self, name, value, labels=None):
+        self.callback("histogram", name, value, dict(_labels(labels)))
+
+    def inc(self, name, value=1.0, labels=None):
+        self.callback("counter", name, value, dict(_labels(labels)))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def metrics_from_config(cfg: Optional[dict]) -> Optional[Metrics]:
+    """Build a metrics backend from the `metrics:` section of firewall.yaml."""
+    if not cfg or not cfg.get("enabled", True):
+        return None
+    return MetricsRegistry()
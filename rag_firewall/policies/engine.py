@@ -1,7 +1,10 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright (c) 2025 Tal Adari
 
-import time
+import heapq, time
+try:
+    import numpy as np
+except Exception: np = None
 
 def _get(meta, dotted, default=None):
     """
@@ -35,66 +38,342 @@ def _get(meta, dotted, default=None):
             return default
     return cur if len(cur) > 1 else (cur[0] if cur else default)
 
-def _recency_score(ts, half_life_days=30.0):
+_ROOTS = ("metadata", "context", "findings")
+
+
+def _walk(cur, parts):
+    """_get's traversal over pre-split parts, starting from a candidate list."""
+    for p in parts:
+        next_level = []
+        for node in cur:
+            if isinstance(node, dict):
+                if p in node:
+                    val = node[p]
+                    if isinstance(val, list):
+                        next_level.extend(val)
+                    else:
+                        next_level.append(val)
+            elif isinstance(node, list):
+                for el in node:
+                    if isinstance(el, dict) and p in el:
+                        val = el[p]
+                        if isinstance(val, list):
+                            next_level.extend(val)
+                        else:
+                            next_level.append(val)
+        cur = next_level
+        if not cur:
+            return None
+    return cur if len(cur) > 1 else (cur[0] if cur else None)
+
+
+def _compile_path(dotted):
+    """
+    Compile a dotted key into resolve(meta, context, findings) with the same
+    result as _get({"metadata":..., "context":..., "findings":...}, dotted).
+    """
+    parts = dotted.split(".")
+    head, rest = parts[0], tuple(parts[1:])
+    if head not in _ROOTS:
+        return lambda meta, context, findings: None
+    slot = _ROOTS.index(head)
+    if not rest:
+        def resolve(meta, context, findings):
+            val = (meta, context, findings)[slot]
+            return _walk(val if isinstance(val, list) else [val], ())
+        return resolve
+    if len(rest) == 1 and head != "findings":
+        key = rest[0]
+        def resolve(meta, context, findings):
+            node = meta if slot == 0 else context
+            if isinstance(node, dict):  # common case: metadata.x / context.x
+                if key not in node:
+                    return None
+                val = node[key]
+                if isinstance(val, list):
+                    return val if len(val) > 1 else (val[0] if val else None)
+                return val
+            return _walk(node if isinstance(node, list) else [node], rest)
+        return resolve
+    def resolve(meta, context, findings):
+        val = (meta, context, findings)[slot]
+        return _walk(val if isinstance(val, list) else [val], rest)
+    return resolve
+
+
+def _compile_predicate(dotted, expected):
+    resolve = _compile_path(dotted)
+    def pred(meta, context, findings):
+        val = resolve(meta, context, findings)
+        if isinstance(val, list):
+            return expected in val  # any(x == expected), evaluated in C
+        return val == expected
+    return pred
+
+
+def _predicate_cost(dotted):
+    """Static ordering: direct metadata/context lookups before deeper or findings walks."""
+    parts = dotted.split(".")
+    if parts[0] == "findings":
+        return 2 + len(parts)
+    return len(parts) - 1
+
+
+def _compile_match(match):
+    """One closure per policy; predicates are ANDed, cheapest first, stopping at the first miss."""
+    items = sorted((match or {}).items(), key=lambda kv: _predicate_cost(kv[0]))
+    preds = tuple(_compile_predicate(k, v) for k, v in items)
+    if not preds:
+        return lambda meta, context, findings: True
+    if len(preds) == 1:
+        return preds[0]
+    def matcher(meta, context, findings):
+        for pred in preds:
+            if not pred(meta, context, findings):
+                return False
+        return True
+    return matcher
+
+
+class CompiledPolicy:
+    __slots__ = ("name", "action", "matcher", "weight", "reason", "spec", "labels")
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.get("name")
+        self.action = spec.get("action", "allow")
+        self.matcher = _compile_match(spec.get("match", {}))
+        self.weight = spec.get("weight", {})
+        if self.action == "deny":
+            self.reason = f"policy:{self.name}"
+        elif self.action in ("rerank", "allow"):
+            self.reason = f"policy:{self.name}:{self.action}"
+        else:
+            self.reason = None
+        self.labels = (("policy", str(self.name)),)  # metrics labels, built once
+
+
+_INDEXABLE = (str, int, float, bool, type(None))
+
+
+class PolicyIndex:
+    """
+    Hash index over equality predicates on metadata.*/context.* keys.
+    Each policy is filed under one of its indexable predicates (preferring
+    keys many policies share); policies without one are always candidates.
+    candidates() returns policy positions in their original order, so the
+    first-match-deny and rerank/allow semantics are unchanged: the full
+    matcher still runs on every candidate, the index only skips policies
+    that cannot match.
+    """
+    def __init__(self, policies):
+        specs = [p.spec.get("match") or {} for p in policies]
+        usable = [[(k, v) for k, v in m.items()
+                   if k.split(".", 1)[0] in ("metadata", "context") and "." in k and isinstance(v, _INDEXABLE)]
+                  for m in specs]
+        freq = {}
+        for preds in usable:
+            for k, _ in preds:
+                freq[k] = freq.get(k, 0) + 1
+        self.fields = {}  # dotted key -> (resolve, {value: [positions]})
+        always = []
+        for pos, preds in enumerate(usable):
+            if not preds:
+                always.append(pos)
+                continue
+            key, value = max(preds, key=lambda kv: freq[kv[0]])
+            if key not in self.fields:
+                self.fields[key] = (_compile_path(key), {})
+            self.fields[key][1].setdefault(value, []).append(pos)
+        self.always = always
+
+    def candidates(self, meta, context, findings):
+        """Lazily yield candidate positions in ascending order (merge of sorted postings)."""
+        lists = [self.always] if self.always else []
+        for resolve, table in self.fields.values():
+            val = resolve(meta, context, findings)
+            if isinstance(val, list):
+                lists.extend(table[x] for x in val if isinstance(x, _INDEXABLE) and x in table)
+            elif isinstance(val, _INDEXABLE):
+                hit = table.get(val)
+                if hit:
+                    lists.append(hit)
+        if len(lists) == 1:
+            return iter(lists[0])
+        return _dedup(heapq.merge(*lists))
+
+
+def _dedup(positions):
+    last = -1
+    for pos in positions:
+        if pos != last:
+            yield pos
+            last = pos
+
+
+def _recency_score(ts, half_life_days=30.0, now=None):
     if not ts: return 1.0
-    age_days = max(0.0, (time.time() - float(ts)) / 86400.0)
+    age_days = max(0.0, ((time.time() if now is None else now) - float(ts)) / 86400.0)
     return 1.0 / (1.0 + (age_days / half_life_days))
 
+def _penalty(findings):
+    """Rerank penalty from a single pass over the findings."""
+    risky = stale = False
+    for f in findings:
+        sc = f.get("scanner")
+        if sc == "conflict":
+            stale = True
+        elif sc in ("encoded","url") and f.get("severity") == "high":
+            risky = True
+    penalty = 0.0
+    if risky: penalty += 0.2
+    if stale: penalty += 0.1
+    return penalty
+
+def _rerank_score(w, recency, provenance, relevance, penalty):
+    return max(0.0, (w.get("recency", 0.0)*recency +
+                     w.get("provenance", 0.0)*provenance +
+                     w.get("relevance", 1.0)*relevance) - penalty)
+
+def _rerank_scores(rows, now, half_life_days=30.0):
+    """
+    Scores for (weight, meta, findings, base_score) rows in one go: the same
+    formula as _rerank_score, as NumPy array operations when NumPy is installed.
+    """
+    ts = [m.get("timestamp") for _, m, _, _ in rows]
+    provenance = [1.0 if m.get("source") else 0.8 for _, m, _, _ in rows]
+    penalty = [_penalty(f) for _, _, f, _ in rows]
+    relevance = [b for _, _, _, b in rows]
+    if np is None or len(rows) < PolicyEngine.VECTOR_MIN_BATCH:
+        return [_rerank_score(w, _recency_score(t, half_life_days, now), pv, rel, pen)
+                for (w, _, _, _), t, pv, rel, pen in zip(rows, ts, provenance, relevance, penalty)]
+    missing = np.array([not t for t in ts])
+    tsv = np.array([float(t) if t else 0.0 for t in ts])
+    recency = np.where(missing, 1.0, 1.0 / (1.0 + (np.maximum(0.0, (now - tsv) / 86400.0) / half_life_days)))
+    wr = np.array([w.get("recency", 0.0) for w, _, _, _ in rows], dtype=float)
+    wp = np.array([w.get("provenance", 0.0) for w, _, _, _ in rows], dtype=float)
+    wl = np.array([w.get("relevance", 1.0) for w, _, _, _ in rows], dtype=float)
+    scores = np.maximum(0.0, (wr*recency + wp*np.array(provenance) + wl*np.array(relevance, dtype=float)) - np.array(penalty))
+    return scores.tolist()
+
+AUTO_DENY_SCANNERS = ("regex_injection", "secrets")
+
+def _auto_deny(findings):
+    return any(f.get("scanner") in AUTO_DENY_SCANNERS and
+               f.get("severity") in ("high","critical") for f in findings)
+
 class PolicyEngine:
-    def __init__(self, policies):
+    # below this many policies a linear pass is cheaper than the index lookup
+    INDEX_MIN_POLICIES = 16
+    # below this many reranked documents plain Python beats building arrays
+    VECTOR_MIN_BATCH = 32
+
+    def __init__(self, policies, use_index=None, metrics=None):
         self.policies = policies or []
+        self.use_index = use_index
+        # optional rag_firewall.metrics backend; per-policy matcher timings
+        self.metrics = metrics
+        self._compiled_for = None
+        self.compile()
 
-    def evaluate(self, doc, findings, context, base_score=1.0):
-        meta = doc.get("metadata", {})
+    def compile(self):
+        """
+        (Re)compile self.policies into matcher closures; done once at load time.
+        Replacing the list or changing its length recompiles on the next call;
+        call compile() yourself after editing a policy dict or assigning
+        policies[i] in place.
+        """
+        self._compiled = [CompiledPolicy(p) for p in self.policies]
+        self._compiled_for = (id(self.policies), len(self.policies))
+        # an allow policy can override the scanner auto-deny
+        self._can_lift_deny = any(p.action == "allow" for p in self._compiled)
+        use_index = self.use_index if self.use_index is not None else len(self._compiled) >= self.INDEX_MIN_POLICIES
+        self._index = PolicyIndex(self._compiled) if use_index else None
+        return self._compiled
+
+    def certain_deny(self, findings):
+        """
+        True when `findings` alone force a deny: an auto-deny finding and no
+        allow policy that could lift it, so scanning and policies can stop early.
+        """
+        if not _auto_deny(findings):
+            return False
+        if self._compiled_for != (id(self.policies), len(self.policies)):
+            self.compile()
+        return not self._can_lift_deny
+
+    def _policies(self, meta, context, findings):
+        if self._compiled_for != (id(self.policies), len(self.policies)):
+            self.compile()  # list replaced or resized; in-place edits need an explicit compile()
+        if self._index is None:
+            return self._compiled
+        compiled = self._compiled
+        return (compiled[i] for i in self._index.candidates(meta, context, findings))
+
+    def _match(self, meta, context, findings):
+        """Policy pass: (action, reasons, policy name, weights of the last matching rerank or None)."""
         reasons = []
-        score = base_score
         action = "allow"
         policy_name = None
+        rerank = None
 
         # auto-deny for high-severity injection/secrets
-        if any(f.get("scanner") in ("regex_injection","secrets") and
-               f.get("severity") in ("high","critical") for f in findings):
+        if _auto_deny(findings):
             action = "deny"
             reasons.append("scanner:auto-deny")
 
-        for p in self.policies:
-            m = p.get("match", {})
-            matched = True
-            for k, v in m.items():
-                val = _get({"metadata": meta, "context": context, "findings": findings}, k, None)
-                if isinstance(val, list):
-                    if not any(x == v for x in val):
-                        matched = False
-                        break
-                else:
-                    if val != v:
-                        matched = False
-                        break
+        metrics = self.metrics
+        for p in self._policies(meta, context, findings):
+            if metrics is None:
+                matched = p.matcher(meta, context, findings)
+            else:
+                t0 = time.perf_counter()
+                matched = p.matcher(meta, context, findings)
+                metrics.observe("ragfw_policy_seconds", time.perf_counter() - t0, p.labels)
             if not matched:
                 continue
 
-            policy_name = p.get("name")
-            act = p.get("action", "allow")
+            policy_name = p.name
+            act = p.action
             if act == "deny":
                 action = "deny"
-                reasons.append(f"policy:{policy_name}")
+                reasons.append(p.reason)
                 break
             elif act == "rerank":
-                w = p.get("weight", {})
-                recency = _recency_score(meta.get("timestamp"))
-                provenance = 1.0 if meta.get("source") else 0.8
-                relevance = base_score
-                penalty = 0.0
-                if any(f.get("scanner") in ("encoded","url") and f.get("severity") == "high" for f in findings):
-                    penalty += 0.2
-                if any(f.get("scanner") in ("conflict",) for f in findings):
-                    penalty += 0.1
-                score = max(0.0, (w.get("recency", 0.0)*recency +
-                                   w.get("provenance", 0.0)*provenance +
-                                   w.get("relevance", 1.0)*relevance) - penalty)
-                reasons.append(f"policy:{policy_name}:rerank")
+                # every rerank recomputes the score from the same inputs, so the last one wins
+                rerank = p.weight
+                reasons.append(p.reason)
             elif act == "allow":
                 action = "allow"
-                reasons.append(f"policy:{policy_name}:allow")
+                reasons.append(p.reason)
+        return action, reasons, policy_name, rerank
+
+    def evaluate(self, doc, findings, context, base_score=1.0):
+        meta = doc.get("metadata", {})
+        action, reasons, policy_name, w = self._match(meta, context, findings)
+        score = base_score
+        if w is not None:
+            score = _rerank_score(w, _recency_score(meta.get("timestamp")),
+                                  1.0 if meta.get("source") else 0.8, base_score, _penalty(findings))
+        return {"action": action, "score": score, "reasons": reasons, "policy": policy_name}
 
-        return {"action": action, "score": score, "reasons": reasons, "policy": policy_name}
\ No newline at end of file
+    def evaluate_batch(self, docs, findings_list, context, base_score=1.0, now=None):
+        """
+        Evaluate a batch of documents. Matching runs per document; rerank scores
+        are then computed together against one reference timestamp (`now`),
+        vectorized with NumPy when it is installed. base_score may be a scalar
+        or one value per document.
+        """
+        now = time.time() if now is None else now
+        bases = list(base_score) if isinstance(base_score, (list, tuple)) else [base_score] * len(docs)
+        out, rows, idx = [], [], []
+        for i, (doc, findings) in enumerate(zip(docs, findings_list)):
+            meta = doc.get("metadata", {})
+            action, reasons, policy_name, w = self._match(meta, context, findings)
+            out.append({"action": action, "score": bases[i], "reasons": reasons, "policy": policy_name})
+            if w is not None:
+                rows.append((w, meta, findings, bases[i])); idx.append(i)
+        if rows:
+            for i, score in zip(idx, _rerank_scores(rows, now)):
+                out[i]["score"] = score
+        return out
@@ -3,3 +3,4 @@
 
 from .hasher import Hasher
 from .store import ProvenanceStore
+from .resolver import ProvenanceResolver
@@ -0,0 +1,145 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+import codecs, hashlib, os, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .store import _UPSERT
+
+_FILES_DDL='''CREATE TABLE IF NOT EXISTS indexed_files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT, indexed_at REAL, source TEXT, sensitivity TEXT)'''
+_FILES_UPSERT='INSERT OR REPLACE INTO indexed_files(path,size,mtime_ns,hash,indexed_at,source,sensitivity) VALUES (?,?,?,?,?,?,?)'
+CHUNK=1<<20
+
+def hash_file(path, chunk_size=CHUNK):
+    """
+    Streaming SHA-256 equal to Hasher.hash_text(open(path).read()): the file is
+    read in chunks, checked to be UTF-8 and newline-normalised (\\r\\n and \\r
+    become \\n, as text mode does) without ever holding it whole.
+    Raises UnicodeDecodeError for files that are not text.
+    """
+    h=hashlib.sha256(); check=codecs.getincrementaldecoder('utf-8')(); carry=b''
+    with open(path,'rb') as f:
+        while True:
+            block=f.read(chunk_size)
+            if not block: break
+            if not block.isascii() or check.getstate()[0]:  # pure ASCII is valid UTF-8 already
+                check.decode(block)
+            block=carry+block; carry=b''
+            if b'\r' in block:
+                if block.endswith(b'\r'):  # may be the first half of \r\n
+                    block, carry = block[:-1], b'\r'
+                block=block.replace(b'\r\n',b'\n').replace(b'\r',b'\n')
+            h.update(block)
+    check.decode(b'',final=True)
+    if carry: h.update(b'\n')
+    return h.hexdigest()
+
+def walk(root):
+    """Yield (path, stat) for regular files under root, depth first; hidden entries are skipped like glob('**/*')."""
+    stack=[root]
+    while stack:
+        d=stack.pop()
+        try:
+            entries=sorted(os.scandir(d), key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs=[]
+        for e in entries:
+            if e.name.startswith('.'): continue
+            try:
+                if e.is_dir(follow_symlinks=False): subdirs.append(e.path)
+                elif e.is_file(): yield e.path, e.stat()
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+class IndexStats:
+    def __init__(self):
+        self.started=time.monotonic(); self.indexed=0; self.skipped=0; self.failed=0; self.relabelled=0; self.bytes=0
+
+    @property
+    def elapsed(self): return time.monotonic()-self.started
+
+    def line(self):
+        rate=self.bytes/max(self.elapsed,1e-9)/1e6
+        relabelled=f', {self.relabelled} relabelled' if self.relabelled else ''
+        return f'{self.indexed} indexed, {self.skipped} unchanged{relabelled}, {self.failed} unreadable, {self.bytes/1e6:.1f} MB at {rate:.1f} MB/s'
+
+class CorpusIndexer:
+    """
+    Parallel, incremental corpus indexer on top of a ProvenanceStore.
+    A walker feeds a thread pool that streams each file through SHA-256 (hashlib
+    and file reads release the GIL); rows are upserted in batches. Every batch
+    records each file's size/mtime in `indexed_files` in the same transaction
+    as its provenance rows, so an interrupted run resumes where it stopped and
+    unchanged files are skipped without being read. A file indexed under a
+    different source/sensitivity is relabelled from its recorded hash, also
+    without being read.
+    """
+    def __init__(self, store, source='uploads', sensitivity='low', workers=None, batch_size=500, incremental=True):
+        self.store=store; self.source=source; self.sensitivity=sensitivity
+        self.workers=workers or min(32,(os.cpu_count() or 1)+4)
+        self.batch_size=max(1,int(batch_size)); self.incremental=incremental
+        with store.connection() as con, con:
+            con.execute(_FILES_DDL)
+            cols={r[1] for r in con.execute('PRAGMA table_info(indexed_files)')}
+            for col in ('source','sensitivity'):  # tables created before these columns existed
+                if col not in cols: con.execute(f'ALTER TABLE indexed_files ADD COLUMN {col} TEXT')
+
+    def _known(self, root):
+        if not self.incremental: return {}
+        prefix=os.path.join(os.path.abspath(root),'')
+        with self.store.connection() as con:
+            rows=con.execute('SELECT path,size,mtime_ns,hash,source,sensitivity FROM indexed_files WHERE substr(path,1,?)=?',(len(prefix),prefix)).fetchall()
+        return {r[0]:r[1:] for r in rows}
+
+    def _flush(self, batch):
+        now=time.time()
+        with self.store.connection() as con, con:
+            hashes=dict.fromkeys(r[3] for r in batch if r[3] is not None)
+            con.executemany(_UPSERT,[(h,self.source,self.sensitivity,now,None) for h in hashes])
+            con.executemany(_FILES_UPSERT,[(p,size,mtime,h,now,self.source,self.sensitivity) for p,size,mtime,h in batch])
+
+    @staticmethod
+    def _hash(item):
+        path, st = item
+        try:
+            return path, st.st_size, st.st_mtime_ns, hash_file(path)
+        except (OSError, UnicodeDecodeError):
+            return path, st.st_size, st.st_mtime_ns, None
+
+    def run(self, root, progress=None, interval=1.0):
+        """Index every file under root; progress(stats) is called about every `interval` seconds."""
+        stats=IndexStats(); known=self._known(root); batch=[]; last=time.monotonic()
+        labels=(self.source,self.sensitivity)
+        def todo():
+            for path, st in walk(root):
+                path=os.path.abspath(path)
+                k=known.get(path)
+                if k is not None and k[:2]==(st.st_size,st.st_mtime_ns):
+                    if tuple(k[3:])==labels:
+                        stats.skipped+=1
+                    else:  # same content, new source/sensitivity: re-record the known hash
+                        done((path,st.st_size,st.st_mtime_ns,k[2]), relabel=True)
+                    continue
+                yield path, st
+        def done(res, relabel=False):
+            nonlocal batch, last
+            path, size, mtime, h = res
+            if relabel: stats.relabelled+=1
+            elif h is None: stats.failed+=1  # remembered too, so unreadable files are not retried until they change
+            else: stats.indexed+=1; stats.bytes+=size
+            batch.append(res)
+            if len(batch)>=self.batch_size: self._flush(batch); batch=[]
+            if progress and time.monotonic()-last>=interval:
+                progress(stats); last=time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ragfw-index') as pool:
+            pending=deque(); window=self.workers*4  # bounded read-ahead keeps memory flat on huge trees
+            for item in todo():
+                pending.append(pool.submit(self._hash,item))
+                while len(pending)>=window or (pending and pending[0].done()):
+                    done(pending.popleft().result())
+            while pending:
+                done(pending.popleft().result())
+        if batch: self._flush(batch)
+        return stats
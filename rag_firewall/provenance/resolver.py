@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+import asyncio
+from ..cache import LRUCache
+from .hasher import Hasher
+
+_MISS=object()
+
+class ProvenanceResolver:
+    """
+    Batched, cached provenance lookups for retrieved chunks.
+    One store query per batch covers every hash not already cached; misses
+    are cached too, so unknown chunks don't hit the store on every query.
+    """
+    FIELDS=("source","sensitivity","version","timestamp")
+
+    def __init__(self, store, maxsize=10000, ttl=300.0):
+        self.store=store
+        self.cache=LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def lookup(self, hashes):
+        """Return {hash: row} for every hash the store knows about."""
+        out={}; missing=[]
+        for h in dict.fromkeys(h for h in hashes if h):
+            row=self.cache.get(h,_MISS)
+            if row is _MISS: missing.append(h)
+            elif row is not None: out[h]=row
+        if missing:
+            if hasattr(self.store,"get_many"): rows=self.store.get_many(missing)
+            else: rows={h:r for h in missing if (r:=self.store.get(h))}
+            for h in missing:
+                row=rows.get(h); self.cache.set(h,row)
+                if row: out[h]=row
+        return out
+
+    def enrich(self, docs):
+        """
+        Merge provenance into each doc's metadata before policy evaluation:
+        the full row goes under metadata["provenance"] and source/sensitivity/
+        version/timestamp fill in keys the retriever left unset. Chunks without
+        metadata["hash"] are hashed from their text.
+        """
+        metas=[]
+        for d in docs:
+            md=d.get("metadata")
+            if md is None: md=d["metadata"]={}
+            if not md.get("hash"): md["hash"]=Hasher.hash_text(d.get("page_content") or "")
+            metas.append(md)
+        rows=self.lookup(md["hash"] for md in metas)
+        for md in metas:
+            row=rows.get(md["hash"])
+            if not row: continue
+            md["provenance"]=dict(row)
+            for k in self.FIELDS:
+                if md.get(k) is None and row.get(k) is not None: md[k]=row[k]
+        return docs
+
+    async def aenrich(self, docs, executor=None):
+        """enrich() with the store round trip moved off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(executor, self.enrich, docs)
+
+def as_resolver(provenance_store):
+    """Accept a store or a resolver (to share its cache across wrappers)."""
+    if provenance_store is None or isinstance(provenance_store, ProvenanceResolver): return provenance_store
+    return ProvenanceResolver(provenance_store)
@@ -1,16 +1,111 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright (c) 2025 Tal Adari
 
-import sqlite3, time
+import os, queue, sqlite3, threading, time
+from contextlib import contextmanager
+
+_COLUMNS=('hash','source','sensitivity','timestamp','version')
+_SELECT='SELECT hash,source,sensitivity,timestamp,version FROM provenance WHERE hash=?'
+_UPSERT='INSERT OR REPLACE INTO provenance(hash,source,sensitivity,timestamp,version) VALUES (?,?,?,?,?)'
+_MAX_VARS=500  # stay well below SQLITE_MAX_VARIABLE_NUMBER on old builds
+
+def _row(row):
+    return None if not row else dict(zip(_COLUMNS,row))
+
 class ProvenanceStore:
-    def __init__(self, path='prov.sqlite'):
-        self.path=path; self._ensure()
+    """
+    SQLite provenance store with a small thread-safe connection pool.
+    Connections are opened once (WAL journal, synchronous=NORMAL) and reused;
+    sqlite3 keeps each connection's statements prepared, so repeated lookups
+    skip parsing. record_many/get_many batch work into one transaction/query.
+    """
+    def __init__(self, path='prov.sqlite', pool_size=4, timeout=30.0):
+        self.path=path; self.timeout=timeout
+        # every ':memory:' connection is its own database, so share exactly one
+        self.pool_size=1 if path==':memory:' else max(1,int(pool_size))
+        self._reset_pool(); self._ensure()
+
+    def _reset_pool(self):
+        self._pid=os.getpid(); self._pool=queue.LifoQueue(); self._opened=0; self._lock=threading.Lock(); self._all=[]
+
+    def _connect(self):
+        con=sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, cached_statements=256)
+        if self.path!=':memory:':
+            con.execute('PRAGMA journal_mode=WAL'); con.execute('PRAGMA synchronous=NORMAL')
+        return con
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; use `with con:` for a transaction."""
+        if self._pid!=os.getpid(): self._reset_pool()  # never share sqlite handles across fork
+        try:
+            con=self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow=self._opened<self.pool_size
+                if grow: self._opened+=1
+            if grow:
+                con=self._connect(); self._all.append(con)
+            else:
+                con=self._pool.get()
+        try:
+            yield con
+        finally:
+            self._pool.put(con)
+
     def _ensure(self):
-        con=sqlite3.connect(self.path); cur=con.cursor();
-        cur.execute('''CREATE TABLE IF NOT EXISTS provenance (hash TEXT PRIMARY KEY, source TEXT, sensitivity TEXT, timestamp REAL, version TEXT)'''); con.commit(); con.close()
+        with self.connection() as con, con:
+            con.execute('''CREATE TABLE IF NOT EXISTS provenance (hash TEXT PRIMARY KEY, source TEXT, sensitivity TEXT, timestamp REAL, version TEXT)''')
+
     def record(self, *, hash, source='', sensitivity='low', timestamp=None, version=None):
         ts=time.time() if timestamp is None else float(timestamp)
-        con=sqlite3.connect(self.path); cur=con.cursor(); cur.execute('INSERT OR REPLACE INTO provenance(hash,source,sensitivity,timestamp,version) VALUES (?,?,?,?,?)',(hash,source,sensitivity,ts,version)); con.commit(); con.close()
+        with self.connection() as con, con:
+            con.execute(_UPSERT,(hash,source,sensitivity,ts,version))
+
+    def record_many(self, rows, batch_size=10000):
+        """
+        Upsert many rows (dicts with the record() keywords) using executemany,
+        one transaction per `batch_size` rows. Returns the number of rows written.
+        """
+        now=time.time(); count=0; batch=[]
+        def flush():
+            with self.connection() as con, con:
+                con.executemany(_UPSERT,batch)
+        for r in rows:
+            ts=r.get('timestamp')
+            batch.append((r['hash'],r.get('source',''),r.get('sensitivity','low'),now if ts is None else float(ts),r.get('version')))
+            if len(batch)>=batch_size:
+                flush(); count+=len(batch); batch=[]
+        if batch:
+            flush(); count+=len(batch)
+        return count
+
     def get(self, hash):
-        con=sqlite3.connect(self.path); cur=con.cursor(); cur.execute('SELECT hash,source,sensitivity,timestamp,version FROM provenance WHERE hash=?',(hash,)); row=cur.fetchone(); con.close();
-        return None if not row else {'hash':row[0],'source':row[1],'sensitivity':row[2],'timestamp':row[3],'version':row[4]}
+        with self.connection() as con:
+            return _row(con.execute(_SELECT,(hash,)).fetchone())
+
+    def get_many(self, hashes):
+        """Look up many hashes at once; returns {hash: row} for those found."""
+        keys=list(dict.fromkeys(h for h in hashes if h))
+        out={}
+        with self.connection() as con:
+            for i in range(0,len(keys),_MAX_VARS):
+                part=keys[i:i+_MAX_VARS]
+                sql='SELECT hash,source,sensitivity,timestamp,version FROM provenance WHERE hash IN (%s)'%','.join('?'*len(part))
+                for row in con.execute(sql,part):
+                    out[row[0]]=_row(row)
+        return out
+
+    def close(self):
+        with self._lock:
+            cons, self._all = self._all, []
+            self._pool=queue.LifoQueue(); self._opened=0
+        for con in cons: con.close()
+
+    def __getstate__(self):
+        state=self.__dict__.copy()
+        for k in ('_pool','_lock','_all'): state.pop(k,None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state); self._reset_pool()
@@ -4,6 +4,7 @@
 import time
 STALE_DAYS_DEFAULT=180
 class ConflictScanner:
+    cost=1  # metadata only
     def __init__(self, stale_days=STALE_DAYS_DEFAULT): self.stale_days=stale_days
     def scan(self, text, metadata):
         out=[]; ts=metadata.get("timestamp"); deprecated=metadata.get("deprecated", False) or metadata.get("status")=="deprecated"
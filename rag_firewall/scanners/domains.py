@@ -0,0 +1,200 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+"""Domain allow/deny lists for the URL scanner.
+
+A host matches a list entry if it equals the entry or is a subdomain of it.
+Lookups hash each suffix of the host (``a.b.example.com``, ``b.example.com``,
+``example.com``, ``com``), so the cost is O(labels in the host) whatever the
+list size.
+
+Large threat-feed lists can be compiled once with ``write_domain_list()`` into a
+compact sorted file that is memory-mapped and binary-searched in place
+(``MappedDomainList``), so a 200k-entry denylist neither needs parsing at start
+up nor lives in every worker's heap. ``load_domains()`` accepts plain text files
+(one domain per line, ``#`` comments) as well and detects the format itself.
+"""
+from __future__ import annotations
+import hashlib, mmap, os, struct
+from typing import Iterable, Iterator, Optional
+
+MAGIC = b"RFWDOM1\n"
+_HEADER = struct.Struct("<I32s")  # entry count, sha256 of the entry blob
+_OFFSET = struct.Struct("<I")
+
+
+def normalize_domain(d: str) -> str:
+    d = (d or "").strip().lower().rstrip(".")
+    if d.startswith("*."):
+        d = d[2:]
+    return d.lstrip(".")
+
+
+def _suffixes(host: str) -> Iterator[str]:
+    i = 0
+    while True:
+        yield host[i:]
+        j = host.find(".", i)
+        if j < 0:
+            return
+        i = j + 1
+
+
+def read_domain_file(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                yield line
+
+
+class DomainSet:
+    """In-memory domain list: a hash set probed once per host suffix."""
+    def __init__(self, domains: Iterable[str] = ()):
+        self._domains = {d for d in map(normalize_domain, domains) if d}
+        # stands in for the contents in scanner fingerprints (findings cache keys)
+        self.digest = hashlib.sha256("\n".join(sorted(self._domains)).encode("utf-8")).hexdigest()
+
+    def match(self, host: str) -> Optional[str]:
+        """The list entry `host` falls under, or None."""
+        if host:
+            domains = self._domains
+            for suffix in _suffixes(host):
+                if suffix in domains:
+                    return suffix
+        return None
+
+    def __contains__(self, domain: str) -> bool:
+        return normalize_domain(domain) in self._domains
+
+    def __iter__(self):
+        return iter(sorted(self._domains))
+
+    def __len__(self) -> int:
+        return len(self._domains)
+
+
+class MappedDomainList:
+    """
+    Read-only domain list backed by a file written by write_domain_list():
+    MAGIC, a header, (count + 1) little-endian uint32 offsets and the sorted
+    UTF-8 entries back to back. Each suffix probe is a binary search in the map.
+    """
+    def __init__(self, path: str):
+        self.path = os.fspath(path)
+        self._mm = None
+        self._open()
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close(); self._mm = None
+            raise ValueError(f"{self.path} is not a compiled domain list")
+        self.count, digest = _HEADER.unpack_from(self._mm, len(MAGIC))
+        self.digest = digest.hex()
+        self._offsets = len(MAGIC) + _HEADER.size
+        self._blob = self._offsets + _OFFSET.size * (self.count + 1)
+
+    def _entry(self, i: int) -> bytes:
+        a, = _OFFSET.unpack_from(self._mm, self._offsets + _OFFSET.size * i)
+        b, = _OFFSET.unpack_from(self._mm, self._offsets + _OFFSET.size * (i + 1))
+        return self._mm[self._blob + a:self._blob + b]
+
+    def _find(self, key: bytes) -> bool:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(mid)
+            if entry == key:
+                return True
+            if entry < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def match(self, host: str) -> Optional[str]:
+        if self._mm is None:
+            self._open()  # unpickled in a worker process
+        if host:
+            for suffix in _suffixes(host):
+                if self._find(suffix.encode("utf-8")):
+                    return suffix
+        return None
+
+    def __contains__(self, domain: str) -> bool:
+        return self.match(normalize_domain(domain)) == normalize_domain(domain)
+
+    def __iter__(self):
+        if self._mm is None:
+            self._open()
+        return (self._entry(i).decode("utf-8") for i in range(self.count))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close(); self._mm = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy(); state["_mm"] = None
+        return state
+
+
+class DomainUnion:
+    """Several lists checked in turn (e.g. inline entries plus a list file)."""
+    def __init__(self, lists):
+        self.lists = list(lists)
+
+    def match(self, host: str) -> Optional[str]:
+        for lst in self.lists:
+            hit = lst.match(host)
+            if hit is not None:
+                return hit
+        return None
+
+    def __contains__(self, domain: str) -> bool:
+        return any(domain in lst for lst in self.lists)
+
+    def __iter__(self):
+        return (d for lst in self.lists for d in lst)
+
+    def __len__(self) -> int:
+        return sum(len(lst) for lst in self.lists)
+
+
+def write_domain_list(domains: Iterable[str], path: str) -> int:
+    """Compile domains into the memory-mappable format; returns the entry count."""
+    entries = sorted({d.encode("utf-8") for d in map(normalize_domain, domains) if d})
+    blob = b"".join(entries)
+    offsets = [0]
+    for e in entries:
+        offsets.append(offsets[-1] + len(e))
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(entries), hashlib.sha256(b"\n".join(entries)).digest()))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(blob)
+    os.replace(tmp, path)
+    return len(entries)
+
+
+def open_domain_file(path: str):
+    """A compiled list is memory-mapped; a text list is read into a DomainSet."""
+    with open(path, "rb") as f:
+        compiled = f.read(len(MAGIC)) == MAGIC
+    return MappedDomainList(path) if compiled else DomainSet(read_domain_file(path))
+
+
+def load_domains(domains: Optional[Iterable[str]] = None, path: Optional[str] = None):
+    parts = []
+    if domains:
+        parts.append(DomainSet(domains))
+    if path:
+        parts.append(open_domain_file(path))
+    if not parts:
+        return DomainSet()
+    return parts[0] if len(parts) == 1 else DomainUnion(parts)
@@ -1,19 +1,83 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright (c) 2025 Tal Adari
 
+import math
+from collections import Counter
 import regex as re
+try:
+    import numpy as np
+except ImportError:  # optional: pip install 'rag-firewall[fast]'
+    np = None
 BASE64_RE=re.compile(r"(?:[A-Za-z0-9+/]{40,}={0,2})")
+_B64_ALPHABET=b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+# everything `\s` matches (all Unicode whitespace lies below U+3001)
+_WS_CHARS=tuple(c for c in map(chr, range(0x3001)) if re.match(r"\s", c))
+_ASCII_WS=bytes(ord(c) for c in _WS_CHARS if ord(c)<128)
+
+_RATIO_BLOCK=1<<16
+
 def _base64_ratio(text):
+    """
+    Share of non-whitespace characters in the base64 alphabet; counted in C via
+    bytes.translate, one block at a time so no copy of the whole text is made
+    (per-character str.count passes avoid copies too, but are 10-40x slower).
+    """
     if not text: return 0.0
-    t=re.sub(r"\s+","",text)
-    if not t: return 0.0
-    b64_chars=sum(1 for ch in t if ch.isalnum() or ch in "+/=")
-    return b64_chars/max(1,len(t))
+    ascii_text=text.isascii(); b64_chars=0; ws=0
+    for i in range(0,len(text),_RATIO_BLOCK):
+        data=text[i:i+_RATIO_BLOCK].encode("utf-8","surrogatepass")
+        rest=data.translate(None,_B64_ALPHABET)
+        b64_chars+=len(data)-len(rest)
+        if ascii_text:  # whitespace is outside the alphabet, so it is all in `rest`
+            ws+=len(rest)-len(rest.translate(None,_ASCII_WS))
+    if not ascii_text:
+        ws=sum(map(text.count,_WS_CHARS))
+    total=len(text)-ws
+    return b64_chars/total if total>0 else 0.0
+
+def _clog_table(window):
+    # c*log2(c) for every possible count, so H = log2(w) - sum(table[c]) / w
+    return [0.0]+[c*math.log2(c) for c in range(1,window+1)]
+
+def _max_window_entropy(data, window=256):
+    """
+    Highest Shannon entropy (bits per byte) over windows of `window` bytes,
+    stepping by half a window. English prose stays near 4.5, hex below 4,
+    while base64 of random data approaches 6.
+    """
+    if len(data)<window: return 0.0
+    step=max(1,window//2); table=_clog_table(window); base=math.log2(window)
+    if np is not None:
+        arr=np.frombuffer(data,dtype=np.uint8); table=np.array(table); best=0.0
+        for off in range(0,window,step):
+            n=(len(arr)-off)//window
+            if n<=0: continue
+            # one bincount for all windows: offset each window's bytes into its own 256 slots
+            idx=arr[off:off+n*window].reshape(n,window).astype(np.int32)
+            idx+=(np.arange(n,dtype=np.int32)*256)[:,None]
+            counts=np.bincount(idx.ravel(),minlength=256*n).reshape(n,256)
+            h=base-table[counts].sum(axis=1)/window
+            best=max(best,float(h.max()))
+        return best
+    best=0.0; g=table.__getitem__
+    for i in range(0,len(data)-window+1,step):
+        h=base-sum(map(g,Counter(data[i:i+window]).values()))/window
+        if h>best: best=h
+    return best
+
 class EncodedContentScanner:
-    def __init__(self, min_len=200, ratio_threshold=0.35):
+    cacheable=True  # findings depend on the text only
+    cost=6  # relative per-chunk cost
+    def __init__(self, min_len=200, ratio_threshold=0.35, entropy_threshold=None, entropy_window=256):
         self.min_len=min_len; self.ratio=ratio_threshold
+        # opt-in: flag windows whose byte entropy reaches the threshold (e.g. 5.2 bits)
+        self.entropy_threshold=entropy_threshold; self.entropy_window=entropy_window
     def scan(self, text, metadata):
-        t=text or ""
+        t=text or ""; out=[]
         if len(t)>=self.min_len and _base64_ratio(t)>=self.ratio and BASE64_RE.search(t):
-            return [{"scanner":"encoded","match":"suspicious_base64_blob","severity":"high"}]
-        return []
+            out.append({"scanner":"encoded","match":"suspicious_base64_blob","severity":"high"})
+        if self.entropy_threshold is not None and len(t)>=self.entropy_window:
+            h=_max_window_entropy(t.encode("utf-8","surrogatepass"),self.entropy_window)
+            if h>=self.entropy_threshold:
+                out.append({"scanner":"encoded","match":"high_entropy_window","severity":"medium","entropy":round(h,3)})
+        return out
@@ -5,10 +5,13 @@ import regex as re
 EMAIL=re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
 PHONE=re.compile(r"(?:\+?\d{1,3})?[\s.-]?(?:\(\d{2,4}\)|\d{2,4})[\s.-]?\d{3,4}[\s.-]?\d{3,4}")
 SSN=re.compile(r"\b\d{3}-\d{2}-\d{4}\b")
+RULES=[(EMAIL,"email","medium"),(PHONE,"phone","medium"),(SSN,"ssn","high")]
 class PIIScanner:
+    cost=5  # relative per-chunk cost
+    cacheable=True  # findings depend on the text only
+    def plan_patterns(self): return [patt for patt,_,_ in RULES]
+    def from_matches(self, hits):
+        return [{"scanner":"pii","match":name,"severity":sev} for (_,name,sev),h in zip(RULES,hits) if h is not None]
     def scan(self, text, metadata):
-        t=text or ""; out=[]
-        if EMAIL.search(t): out.append({"scanner":"pii","match":"email","severity":"medium"})
-        if PHONE.search(t): out.append({"scanner":"pii","match":"phone","severity":"medium"})
-        if SSN.search(t): out.append({"scanner":"pii","match":"ssn","severity":"high"})
-        return out
+        t=text or ""
+        return self.from_matches([(m.group(0) if (m:=patt.search(t)) else None) for patt,_,_ in RULES])
@@ -0,0 +1,345 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright (c) 2025 Tal Adari
+
+"""Compiled scan plan shared by all pattern-based scanners.
+
+Scanners that expose ``plan_patterns()`` / ``from_matches(hits)`` hand their
+patterns to the plan once, at Firewall construction. Identical patterns are
+deduplicated across scanners, every chunk is matched once per unique pattern
+and the leftmost match of each is routed back to the owning scanner(s), which
+turn them into findings exactly as their own ``scan()`` would.
+
+With ``merge=True`` the mergeable patterns are additionally fused into one
+automaton: each pattern becomes an optional named lookahead behind a gate that
+only fires where at least one pattern can start, so the chunk is walked once
+and every pattern still reports the same leftmost match as ``patt.search``.
+The ``regex`` engine cannot use its literal-prefix search on such an
+alternation, so on typical chunks this is slower than per-pattern matching and
+is therefore opt-in.
+
+Before any regex runs, a literal prefilter checks the case-folded chunk for the
+literals each pattern cannot match without (``AKIA``, ``ghp_``, ``ignore ``,
+``-----begin`` ...), extracted automatically from the pattern source. Patterns
+whose literals are absent are skipped, so clean chunks mostly cost a handful of
+substring searches.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import regex as re
+
+_LEADING_FLAGS = re.compile(r"^\(\?([imsx]+)\)")
+# Constructs that cannot be renumbered/renamed inside a merged alternation.
+_UNMERGEABLE = re.compile(r"\\[1-9]|\(\?P=|\(\?P>|\(\?&|\(\?R\)|\(\?[0-9]|\(\?[aiLmsux]+\)")
+_SCOPED_FLAGS = ((re.I, "i"), (re.M, "m"), (re.S, "s"))
+_MIN_LITERAL = 3  # shorter literals filter too little to be worth a search
+
+
+def _gateable(ch: str) -> bool:
+    """
+    Whether `ch` may be part of a prefilter literal. (?i) uses simple case
+    folding, the gate full casefold(): characters that fold to several
+    (İ -> i̇, ß -> ss) would make the gate stricter than the regex, and
+    dotless ı is folded to "i" on the text side (see _fold).
+    """
+    return ch.isascii() or (len(ch.casefold()) == 1 and ch != "ı")
+_HEX_ESCAPES = {"x": 2, "u": 4, "U": 8}
+
+
+def _escape_end(src: str, i: int) -> int:
+    """Index just past the escape at src[i] == '\\' whose next character is a letter or digit."""
+    c = src[i + 1]; j = i + 2
+    if src[j:j + 1] == "{" and c in "xNpPg":  # \x{...}, \N{...}, \p{...}, \g{...}
+        close = src.find("}", j)
+        return close + 1 if close != -1 else len(src)
+    if c == "g" and src[j:j + 1] == "<":
+        close = src.find(">", j)
+        return close + 1 if close != -1 else len(src)
+    if c in _HEX_ESCAPES:
+        n = _HEX_ESCAPES[c]
+        while n and j < len(src) and src[j] in "0123456789abcdefABCDEF":
+            j += 1; n -= 1
+        return j
+    if c.isdigit():  # octal (\0, \101) or backreference: swallow every digit
+        while j < len(src) and src[j].isdigit():
+            j += 1
+        return j
+    if c in "pP":  # \pL
+        return min(j + 1, len(src))
+    return j
+
+
+def _skip_class(src: str, i: int) -> int:
+    """Index just past the character class opened at src[i] == '['."""
+    i += 1
+    if src[i:i + 1] == "^":
+        i += 1
+    if src[i:i + 1] == "]":
+        i += 1  # a leading ']' is literal
+    depth = 1
+    while i < len(src) and depth:
+        c = src[i]
+        if c == "\\":
+            i += 1
+        elif c == "[":
+            depth += 1  # nested set (VERSION1)
+        elif c == "]":
+            depth -= 1
+        i += 1
+    return i
+
+
+def _skip_group(src: str, i: int) -> int:
+    """Index just past the group opened at src[i] == '('."""
+    depth = 0
+    while i < len(src):
+        c = src[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            i = _skip_class(src, i)
+            continue
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _split_top(src: str) -> List[str]:
+    """Split a pattern on top-level `|`."""
+    parts, start, i = [], 0, 0
+    while i < len(src):
+        c = src[i]
+        if c == "\\":
+            i += 2
+        elif c == "[":
+            i = _skip_class(src, i)
+        elif c == "(":
+            i = _skip_group(src, i)
+        elif c == "|":
+            parts.append(src[start:i]); start = i = i + 1
+        else:
+            i += 1
+    parts.append(src[start:])
+    return parts
+
+
+def _longest_literal(branch: str) -> str:
+    """Longest run of literal characters every match of `branch` must contain."""
+    best, run, i = "", [], 0
+    def cut():
+        nonlocal best
+        lit = "".join(run)
+        if len(lit) > len(best):
+            best = lit
+        run.clear()
+    while i < len(branch):
+        c = branch[i]
+        if c in "*?{":
+            if run:
+                run.pop()  # the quantified character may be absent
+            cut()
+            if c == "{":
+                close = branch.find("}", i)
+                i = close + 1 if close != -1 else len(branch)
+            else:
+                i += 1
+            if i < len(branch) and branch[i] in "?+":
+                i += 1  # lazy/possessive suffix
+            continue
+        if c == "+":
+            cut(); i += 1
+            continue
+        if c == "\\":
+            nxt = branch[i + 1:i + 2]
+            if nxt and not nxt.isalnum():
+                if _gateable(nxt):
+                    run.append(nxt)
+                else:
+                    cut()
+                i += 2
+            elif nxt:
+                # \xHH, \101, \N{...}, \d ...: the escape and its operand are not literal text
+                cut(); i = _escape_end(branch, i)
+            else:
+                cut(); i += 1
+            continue
+        if c == "[":
+            cut(); i = _skip_class(branch, i)
+            continue
+        if c == "(":
+            cut(); i = _skip_group(branch, i)
+            continue
+        if c in ".^$)":
+            cut(); i += 1
+            continue
+        if not _gateable(c):
+            cut(); i += 1
+            continue
+        run.append(c); i += 1
+    cut()
+    return best
+
+
+def required_literals(patt) -> Optional[Tuple[str, ...]]:
+    """
+    Case-folded literals at least one of which occurs in every match of `patt`,
+    or None if no useful literal can be extracted (the pattern always runs).
+    """
+    if patt.flags & re.X:
+        return None
+    src = _LEADING_FLAGS.sub("", patt.pattern, count=1)
+    lits = []
+    for branch in _split_top(src):
+        lit = _longest_literal(branch)
+        if len(lit) < _MIN_LITERAL:
+            return None
+        lits.append(lit.casefold())
+    return tuple(dict.fromkeys(lits))
+
+
+_TURKISH_I = {0x130: "i", 0x131: "i"}
+
+
+def _fold(text: str) -> str:
+    # casefold (not lower) so e.g. U+017F LONG S -> "s", in line with (?i) matching;
+    # (?i)i also matches İ and ı, which casefold to "i̇" and "ı", so both become "i" first.
+    # For ASCII text lower() is the same and cheaper
+    return text.lower() if text.isascii() else text.translate(_TURKISH_I).casefold()
+
+
+class LazyMatches:
+    """Per-chunk state for ScanPlan.findings_lazy(): each pattern runs on first use."""
+    __slots__ = ("text", "_folded", "found")
+
+    def __init__(self, text: str):
+        self.text = text or ""; self._folded = None
+        self.found: Dict[int, Optional[str]] = {}
+
+    @property
+    def folded(self) -> str:
+        if self._folded is None:
+            self._folded = _fold(self.text)
+        return self._folded
+
+
+def _scoped_source(patt) -> Optional[str]:
+    """Rewrite a compiled pattern as a self-contained group, or None if it must run alone."""
+    if patt.groupindex or patt.flags & re.X:
+        return None
+    src = _LEADING_FLAGS.sub("", patt.pattern, count=1)
+    if _UNMERGEABLE.search(src):
+        return None
+    flags = "".join(c for f, c in _SCOPED_FLAGS if patt.flags & f)
+    return f"(?{flags}:{src})" if flags else f"(?:{src})"
+
+
+class ScanPlan:
+    """Compiled once per Firewall; routes matches back to the owning scanners."""
+    def __init__(self, scanners, merge: bool = False, prefilter: bool = True):
+        self.scanners = list(scanners)
+        self.merge = merge
+        self.prefilter = prefilter
+        self.patterns: List = []  # unique compiled patterns across all scanners
+        # per scanner: None (not planned) or indices into self.patterns
+        self._slots: List[Optional[List[int]]] = []
+        index: Dict[Tuple[str, int], int] = {}
+        for s in self.scanners:
+            if not (hasattr(s, "plan_patterns") and hasattr(s, "from_matches")):
+                self._slots.append(None)
+                continue
+            slots = []
+            for patt in s.plan_patterns():
+                key = (patt.pattern, patt.flags)
+                if key not in index:
+                    index[key] = len(self.patterns)
+                    self.patterns.append(patt)
+                slots.append(index[key])
+            self._slots.append(slots)
+
+        # per pattern: literals gating it (any must be present), or None to always run
+        self.literals: List[Optional[Tuple[str, ...]]] = [required_literals(p) if prefilter else None for p in self.patterns]
+
+        self._automaton = None
+        self._merged: List[int] = []
+        self._standalone: List[int] = list(range(len(self.patterns)))
+        if merge:
+            self._build_automaton()
+
+    def _build_automaton(self):
+        sources = {i: _scoped_source(p) for i, p in enumerate(self.patterns)}
+        merged = [i for i, src in sources.items() if src is not None]
+        if not merged:
+            return
+        gate = "(?=" + "|".join(sources[i] for i in merged) + ")"
+        body = "".join(f"(?:(?=(?P<p{i}>{sources[i]}))|)" for i in merged)
+        try:
+            self._automaton = re.compile(gate + body)
+        except re.error:
+            return  # keep per-pattern matching rather than failing the firewall
+        self._merged = merged
+        self._standalone = [i for i in range(len(self.patterns)) if sources[i] is None]
+
+    def planned(self, scanner_index: int) -> bool:
+        return self._slots[scanner_index] is not None
+
+    def _absent(self, i: int, folded: str, seen: Optional[Dict[str, bool]] = None) -> bool:
+        lits = self.literals[i]
+        if lits is None:
+            return False
+        if seen is None:
+            return not any(lit in folded for lit in lits)
+        for lit in lits:
+            found = seen.get(lit)
+            if found is None:
+                found = seen[lit] = lit in folded
+            if found:
+                return False
+        return True
+
+    def match(self, text: str) -> List[Optional[str]]:
+        """Return the leftmost matched text (or None) for every unique pattern."""
+        hits: List[Optional[str]] = [None] * len(self.patterns)
+        if not text:
+            return hits
+        folded = _fold(text) if self.prefilter else ""
+        seen: Dict[str, bool] = {}
+        for i in self._standalone:
+            if self._absent(i, folded, seen):
+                continue
+            m = self.patterns[i].search(text)
+            if m:
+                hits[i] = m.group(0)
+        if self._automaton is not None and not all(self._absent(i, folded, seen) for i in self._merged):
+            pending = len(self._merged)
+            for m in self._automaton.finditer(text):
+                for name, val in m.groupdict().items():
+                    i = int(name[1:])
+                    if val is not None and hits[i] is None:
+                        hits[i] = val
+                        pending -= 1
+                if not pending:
+                    break
+        return hits
+
+    def lazy(self, text: str) -> LazyMatches:
+        return LazyMatches(text)
+
+    def findings_lazy(self, scanner_index: int, state: LazyMatches) -> List[dict]:
+        """findings_for() matching only this scanner's patterns not already run for `state`."""
+        slots = self._slots[scanner_index]
+        for i in slots:
+            if i not in state.found:
+                m = None
+                if state.text and not (self.prefilter and self._absent(i, state.folded)):
+                    m = self.patterns[i].search(state.text)
+                state.found[i] = m.group(0) if m else None
+        return self.scanners[scanner_index].from_matches([state.found[i] for i in slots]) or []
+
+    def findings_for(self, scanner_index: int, hits: List[Optional[str]]) -> List[dict]:
+        s = self.scanners[scanner_index]
+        return s.from_matches([hits[i] for i in self._slots[scanner_index]]) or []
@@ -4,10 +4,13 @@
 import regex as re
 DEFAULT_PATTERNS=[r"(?i)ignore (all|previous) instructions", r"(?i)reveal (the )?system prompt", r"(?i)disregard all rules"]
 class RegexInjectionScanner:
+    auto_deny=True  # matches are auto-denied by PolicyEngine
+    cost=2  # relative per-chunk cost
+    cacheable=True  # findings depend on the text only
     def __init__(self, patterns=None): import regex as re; self.patterns=[re.compile(p) for p in (patterns or DEFAULT_PATTERNS)]
+    def plan_patterns(self): return list(self.patterns)
+    def from_matches(self, hits):
+        return [{"scanner":"regex_injection","match":h[:120],"severity":"high"} for h in hits if h is not None]
     def scan(self, text, metadata): 
-        t=text or ""; out=[]
-        for patt in self.patterns:
-            m=patt.search(t)
-            if m: out.append({"scanner":"regex_injection","match":m.group(0)[:120],"severity":"high"})
-        return out
+        t=text or ""
+        return self.from_matches([(m.group(0) if (m:=patt.search(t)) else None) for patt in self.patterns])
@@ -9,13 +9,17 @@ PATTERNS=[(r"AKIA[0-9A-Z]{16}","aws_access_key"),(r"ASIA[0-9A-Z]{16}","aws_temp_
 (r"(?i)bearer\s+[A-Za-z0-9\-_\.=]{20,}","bearer_token"),
 (r"-----BEGIN (?:RSA|OPENSSH|EC) PRIVATE KEY-----","private_key")]
 class SecretsScanner:
+    auto_deny=True  # high-severity secrets are auto-denied by PolicyEngine
+    cost=3  # relative per-chunk cost
+    cacheable=True  # findings depend on the text only
     def __init__(self, extra_patterns=None):
         import regex as re
         self.patterns=[(re.compile(p),name) for p,name in PATTERNS]
         if extra_patterns:
             for p in extra_patterns: self.patterns.append((re.compile(p),"custom_secret"))
+    def plan_patterns(self): return [patt for patt,_ in self.patterns]
+    def from_matches(self, hits):
+        return [{"scanner":"secrets","match":name,"severity":"high"} for (_,name),h in zip(self.patterns,hits) if h is not None]
     def scan(self, text, metadata):
-        t=text or ""; out=[]
-        for patt,name in self.patterns:
-            if patt.search(t): out.append({"scanner":"secrets","match":name,"severity":"high"})
-        return out
+        t=text or ""
+        return self.from_matches([(m.group(0) if (m:=patt.search(t)) else None) for patt,_ in self.patterns])
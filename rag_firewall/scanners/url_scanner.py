@@ -2,20 +2,50 @@
 # Copyright (c) 2025 Tal Adari
 
 import regex as re
-from urllib.parse import urlparse
+from .domains import load_domains
 URL_RE=re.compile(r"https?://[\w\-\.:%#@/\?=~\+,&]+", re.I)
+
+def _hostname(url):
+    """
+    Host of `url` ('' if missing) without building a ParseResult. Same as
+    urlparse(url).hostname, except that urlparse leaves everything after a '%'
+    unlowercased in any host; here only a bracketed IPv6 zone id is kept
+    verbatim, so "EVIL.com%X" cannot dodge a lowercase denylist by case.
+    """
+    rest=url[url.find("://")+3:]
+    end=len(rest)
+    for sep in "/?#":
+        i=rest.find(sep)
+        if 0<=i<end: end=i
+    hostinfo=rest[:end].rpartition("@")[2]
+    _, bracket, bracketed=hostinfo.partition("[")
+    host=bracketed.partition("]")[0] if bracket else hostinfo.partition(":")[0]
+    if bracket and "%" in host:  # IPv6 zone ids are case-sensitive interface names
+        host, pct, zone=host.partition("%")
+        return host.lower()+pct+zone
+    return host.lower()
+
 class URLScanner:
-    def __init__(self, allowlist=None, denylist=None):
-        self.allowlist=set([d.lower() for d in (allowlist or [])])
-        self.denylist=set([d.lower() for d in (denylist or [])])
+    cacheable=True  # findings depend on the text only
+    cost=4  # relative per-chunk cost
+    def __init__(self, allowlist=None, denylist=None, allowlist_file=None, denylist_file=None):
+        # O(labels) suffix lookups; *_file may be a text list or one compiled by write_domain_list()
+        self.allowlist=load_domains(allowlist, allowlist_file)
+        self.denylist=load_domains(denylist, denylist_file)
+    def _classify(self, host):
+        host=host.rstrip(".")  # "evil.com." is the same host as "evil.com"
+        if self.denylist and self.denylist.match(host) is not None:
+            return "high", "denylist_domain"
+        if self.allowlist and self.allowlist.match(host) is None:
+            return "high", "non_allowlisted_domain"
+        return "low", "url_found"
     def scan(self, text, metadata):
-        t=text or ""; out=[]
+        t=text or ""; out=[]; seen=set(); verdicts={}
         for m in URL_RE.findall(t):
-            host=(urlparse(m).hostname or "").lower()
-            sev="low"; reason="url_found"
-            if self.denylist and any(host==d or host.endswith("."+d) for d in self.denylist):
-                sev="high"; reason="denylist_domain"
-            elif self.allowlist and not any(host==d or host.endswith("."+d) for d in self.allowlist):
-                sev="high"; reason="non_allowlisted_domain"
+            if m in seen: continue  # one finding per distinct URL in the chunk
+            seen.add(m)
+            host=_hostname(m)
+            if host not in verdicts: verdicts[host]=self._classify(host)
+            sev, reason=verdicts[host]
             out.append({"scanner":"url","match":host or m,"severity":sev,"reason":reason})
         return out
@@ -0,0 +1,39 @@
+import json
+
+from rag_firewall import bench
+
+
+def test_bench_corpora_are_seeded_and_sized():
+    for kind in bench.KINDS:
+        text = bench.make_corpus(kind, 4096, seed=1)
+        assert len(text) == 4096 and text == bench.make_corpus(kind, 4096, seed=1)
+    assert bench.parse_size("1k") == 1024 and bench.parse_size("1MB") == 1 << 20 and bench.parse_size("300") == 300
+
+
+def test_bench_run_and_compare(tmp_path):
+    result = bench.run(sizes=[256], policy_counts=(1, 5), graph_sizes=(5,), io_events=20, repeat=1, min_time=0.0)
+    json.dumps(result)  # JSON-serializable as written by `ragfw bench --out`
+    suites = {r["suite"] for r in result["results"]}
+    assert suites == set(bench.SUITES)
+    assert all(r["seconds"] > 0 for r in result["results"])
+    assert bench.compare(result, result) == []
+    slower = json.loads(json.dumps(result))
+    slower["results"][0]["seconds"] *= 2
+    assert [r["name"] for r in bench.compare(result, slower)] == [result["results"][0]["name"]]
+
+
+def test_bench_baseline_rows_and_audit_sink_restored(tmp_path):
+    from rag_firewall.audit import Audit, AsyncAuditSink
+    previous = Audit.sink()
+    sink = AsyncAuditSink(str(tmp_path / "audit.jsonl"))
+    Audit.set_sink(sink)
+    try:
+        result = bench.run(suites=["baseline"], sizes=[512], repeat=1, min_time=0.0)
+        assert Audit.sink() is sink and not sink._closed
+    finally:
+        Audit.set_sink(previous)
+    rows = {(r["name"], r["params"]["corpus"]): r for r in result["results"]}
+    assert set(rows) == {("_base64_ratio[legacy]", "clean"), ("_base64_ratio", "clean"),
+                         ("_base64_ratio[legacy]", "base64"), ("_base64_ratio", "base64"),
+                         ("_hostname[legacy]", "urls"), ("_hostname", "urls")}
+    assert all(r["speedup"] > 0 for name, r in rows.items() if not name[0].endswith("[legacy]"))
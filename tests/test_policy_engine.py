@@ -64,4 +64,77 @@ def test_rerank_weights_applied_and_no_deny():
     ])
     dec = pe.evaluate(_doc(), findings, context={}, base_score=base_score)
     assert dec["action"] in ("allow", "rerank")
-    assert "policy:prefer_recent:rerank" in dec["reasons"]
\ No newline at end of file
+    assert "policy:prefer_recent:rerank" in dec["reasons"]
+
+
+def test_compiled_matchers_agree_with_get():
+    from rag_firewall.policies.engine import _get, _compile_predicate
+    meta = {"source": "wiki", "tags": ["a", "b"], "owner": {"team": "sec"}, "empty": []}
+    context = {"tenant": "acme"}
+    findings = [{"scanner": "url", "url": {"reason": "denylist_domain"}}, {"scanner": "pii"}]
+    root = {"metadata": meta, "context": context, "findings": findings}
+    for key in ("metadata.source", "metadata.tags", "metadata.owner.team", "metadata.empty", "metadata.missing",
+                "context.tenant", "findings.scanner", "findings.url.reason", "other.key"):
+        for expected in ("wiki", "a", "sec", "acme", "pii", "denylist_domain", None, []):
+            val = _get(root, key, None)
+            want = any(x == expected for x in val) if isinstance(val, list) else val == expected
+            assert _compile_predicate(key, expected)(meta, context, findings) == want, (key, expected)
+
+def test_policies_recompile_when_list_changes():
+    pe = PolicyEngine([{"name": "allow_default", "action": "allow"}])
+    pe.policies.insert(0, {"name": "deny_wiki", "match": {"findings.scanner": "pii", "metadata.source": "wiki"}, "action": "deny"})
+    doc = {"page_content": "x", "metadata": {"source": "wiki"}}
+    assert pe.evaluate(doc, [{"scanner": "pii"}], context={})["policy"] == "deny_wiki"
+    assert pe.evaluate(doc, [], context={})["policy"] == "allow_default"
+
+def test_policy_index_preserves_order_and_decisions():
+    policies = [
+        {"name": "boost_wiki", "match": {"metadata.source": "wiki"}, "action": "rerank", "weight": {"relevance": 0.5}},
+        {"name": "deny_secret_hr", "match": {"metadata.source": "hr", "findings.scanner": "secrets"}, "action": "deny"},
+        {"name": "deny_high", "match": {"metadata.sensitivity": "high"}, "action": "deny"},
+        {"name": "allow_untagged", "match": {"metadata.sensitivity": None}, "action": "allow"},
+        {"name": "deny_tenant", "match": {"context.tenant": "blocked"}, "action": "deny"},
+        {"name": "allow_default", "action": "allow"},
+    ] + [{"name": f"src{i}", "match": {"metadata.source": f"src{i}"}, "action": "rerank"} for i in range(20)]
+    docs = [
+        ({"source": "wiki"}, [], {}),
+        ({"source": ["hr", "wiki"]}, [{"scanner": "secrets"}], {}),
+        ({"source": "hr", "sensitivity": "low"}, [], {"tenant": "blocked"}),
+        ({"source": "src7", "sensitivity": "high"}, [], {}),
+        ({"sensitivity": "low"}, [], {}),
+    ]
+    indexed, linear = PolicyEngine(policies, use_index=True), PolicyEngine(policies, use_index=False)
+    for meta, findings, ctx in docs:
+        doc = {"page_content": "x", "metadata": meta}
+        assert indexed.evaluate(doc, findings, ctx, 0.7) == linear.evaluate(doc, findings, ctx, 0.7)
+    assert indexed.evaluate({"metadata": {"source": ["hr", "wiki"]}}, [{"scanner": "secrets"}], {})["policy"] == "deny_secret_hr"
+
+def test_evaluate_batch_matches_per_document_scores(monkeypatch):
+    import rag_firewall.policies.engine as engine
+    now = time.time()
+    pe = PolicyEngine([
+        {"name": "deny_hr", "match": {"metadata.source": "hr"}, "action": "deny"},
+        {"name": "rerank", "action": "rerank", "weight": {"recency": 0.5, "provenance": 0.2, "relevance": 0.3}},
+    ])
+    docs, findings = [], []
+    for i in range(80):
+        docs.append({"page_content": "x", "metadata": {"timestamp": now - i * 86400 if i % 3 else None,
+                                                       "source": ["wiki", "", "hr"][i % 3]}})
+        findings.append([{"scanner": "url", "severity": "high"}] if i % 4 == 0 else [{"scanner": "conflict"}] if i % 5 == 0 else [])
+    bases = [1.0 - i / 100 for i in range(80)]
+    expected = []
+    for d, f, b in zip(docs, findings, bases):
+        dec = pe.evaluate(d, f, {}, b)
+        expected.append((dec["action"], dec["reasons"], round(dec["score"], 6)))
+    for numpy_module in (engine.np, None):
+        monkeypatch.setattr(engine, "np", numpy_module)
+        got = pe.evaluate_batch(docs, findings, {}, bases, now=now)
+        assert [(g["action"], g["reasons"], round(g["score"], 6)) for g in got] == expected
+
+
+def test_in_place_policy_edits_need_compile():
+    pe = PolicyEngine([{"name": "deny_wiki", "match": {"metadata.source": "wiki"}, "action": "deny"}])
+    doc = {"page_content": "x", "metadata": {"source": "wiki"}}
+    pe.policies[0]["match"]["metadata.source"] = "hr"
+    pe.compile()
+    assert pe.evaluate(doc, [], context={})["policy"] is None
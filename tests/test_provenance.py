@@ -0,0 +1,106 @@
+# SPDX-License-Identifier: Apache-2.0
+import threading
+
+from rag_firewall.provenance import Hasher, ProvenanceStore
+
+
+def test_record_many_and_get_many(tmp_path):
+    store = ProvenanceStore(str(tmp_path / "prov.sqlite"))
+    rows = [{"hash": Hasher.hash_text(f"doc {i}"), "source": "wiki", "sensitivity": "low", "version": str(i)} for i in range(1200)]
+    assert store.record_many(rows, batch_size=500) == 1200
+    wanted = [r["hash"] for r in rows[::100]] + ["missing"]
+    found = store.get_many(wanted)
+    assert set(found) == set(wanted[:-1])
+    assert found[rows[300]["hash"]]["version"] == "300"
+    store.record(hash=rows[0]["hash"], source="upload", sensitivity="high", timestamp=5.0)
+    assert store.get(rows[0]["hash"]) == {"hash": rows[0]["hash"], "source": "upload", "sensitivity": "high", "timestamp": 5.0, "version": None}
+    store.close()
+
+
+def test_pool_is_shared_across_threads(tmp_path):
+    store = ProvenanceStore(str(tmp_path / "prov.sqlite"), pool_size=2)
+    def work(k):
+        for i in range(50):
+            store.record(hash=f"{k}-{i}", source=str(k))
+            assert store.get(f"{k}-{i}")["source"] == str(k)
+    threads = [threading.Thread(target=work, args=(k,)) for k in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(store.get_many(f"{k}-{i}" for k in range(6) for i in range(50))) == 300
+    assert store._opened <= 2
+    store.close()
+
+
+class _CountingStore(ProvenanceStore):
+    batches = 0
+    def get_many(self, hashes):
+        _CountingStore.batches += 1
+        return super().get_many(hashes)
+
+
+class _ListRetriever:
+    def __init__(self, texts): self.texts = texts
+    def get_relevant_documents(self, query):
+        return [{"page_content": t, "metadata": {}} for t in self.texts]
+
+
+def test_wrappers_merge_provenance_with_one_cached_lookup(tmp_path):
+    from rag_firewall import Firewall, wrap_retriever
+    from rag_firewall.provenance import ProvenanceResolver
+    from rag_firewall.integrations.langchain import FirewallRetriever
+
+    texts = ["Payroll export", "Team offsite agenda", "Unindexed note"]
+    store = _CountingStore(str(tmp_path / "prov.sqlite"))
+    store.record(hash=Hasher.hash_text(texts[0]), source="hr", sensitivity="high", version="3")
+    store.record(hash=Hasher.hash_text(texts[1]), source="wiki", sensitivity="low")
+    fw = Firewall(policies=[{"name": "block_high_sensitivity", "match": {"metadata.sensitivity": "high"}, "action": "deny"}])
+    resolver = ProvenanceResolver(store)
+    _CountingStore.batches = 0
+
+    safe = wrap_retriever(_ListRetriever(texts), fw, provenance_store=resolver).get_relevant_documents("q")
+    assert [d["page_content"] for d in safe] == texts[1:]
+    assert safe[0]["metadata"]["source"] == "wiki" and safe[0]["metadata"]["provenance"]["sensitivity"] == "low"
+    assert "provenance" not in safe[1]["metadata"]
+
+    class Doc:
+        def __init__(self, page_content, metadata): self.page_content = page_content; self.metadata = metadata
+    class LCBase:
+        def get_relevant_documents(self, query): return [Doc(t, {}) for t in texts]
+    lc = FirewallRetriever(LCBase(), firewall=fw, provenance_store=resolver)
+    assert [d.page_content for d in lc.get_relevant_documents("q")] == texts[1:]
+    # the second query is served entirely from the resolver's cache (misses included)
+    assert _CountingStore.batches == 1
+
+
+def test_corpus_indexer_is_incremental(tmp_path):
+    import os
+    from rag_firewall.provenance.indexer import CorpusIndexer, hash_file
+
+    docs = tmp_path / "docs"; (docs / "sub").mkdir(parents=True)
+    (docs / "a.txt").write_bytes(b"line one\r\nline two\rend\r")
+    (docs / "sub" / "b.txt").write_text("café " * 5000, encoding="utf-8")
+    (docs / "blob.bin").write_bytes(b"\xff\xfe\x00binary")
+    (docs / ".hidden").write_text("skipped")
+    with open(docs / "a.txt", encoding="utf-8") as f:
+        assert hash_file(str(docs / "a.txt"), chunk_size=3) == Hasher.hash_text(f.read())
+
+    store = ProvenanceStore(str(tmp_path / "prov.sqlite"))
+    first = CorpusIndexer(store, source="wiki", workers=2, batch_size=1).run(str(docs))
+    assert (first.indexed, first.skipped, first.failed) == (2, 0, 1)
+    assert store.get(Hasher.hash_text("café " * 5000))["source"] == "wiki"
+
+    again = CorpusIndexer(store, source="wiki").run(str(docs))
+    assert (again.indexed, again.skipped, again.failed) == (0, 3, 0)
+    # a new classification is recorded from the stored hashes, without re-reading
+    relabel = CorpusIndexer(store, source="wiki", sensitivity="high").run(str(docs))
+    assert (relabel.indexed, relabel.skipped, relabel.relabelled, relabel.bytes) == (0, 0, 3, 0)
+    assert store.get(Hasher.hash_text("café " * 5000))["sensitivity"] == "high"
+    assert CorpusIndexer(store, source="wiki", sensitivity="high").run(str(docs)).skipped == 3
+
+    (docs / "sub" / "b.txt").write_text("changed", encoding="utf-8")
+    os.utime(docs / "sub" / "b.txt", ns=(1, 1))
+    third = CorpusIndexer(store, source="wiki", sensitivity="high").run(str(docs))
+    assert (third.indexed, third.skipped) == (1, 2)
+    assert store.get(Hasher.hash_text("changed")) is not None
+    assert CorpusIndexer(store, incremental=False).run(str(docs)).indexed == 2
+    store.close()